@@ -1,6 +1,7 @@
 import warnings
 import numpy
 import os
+import re
 import inspect
 from StringIO import StringIO
 from collections import OrderedDict
@@ -10,7 +11,8 @@ from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.sql import expression
 from sqlalchemy.engine import reflection, url
 from sqlalchemy import (create_engine, MetaData,
-                        Table, event)
+                        Table, Column, event)
+from sqlalchemy import types as satypes
 from sqlalchemy import exc as sa_exc
 from lsst.daf.butler.registry import DbAuth
 
@@ -45,42 +47,129 @@ def declareTrigFunctions(conn,connection_rec,connection_proxy):
     conn.create_function("POWER",2,numpy.power)
     conn.create_function("PI",0,valueOfPi)
 
+#Number of bytes of an sqlite database file that sqlite may memory-map
+#(PRAGMA mmap_size) on connections opened after it is set.  Pages that fall
+#in the mapped region are read straight out of the OS page cache instead of
+#being copied out with a read() call for every page.  None (the default)
+#leaves sqlite's own setting alone.
+sqliteMmapSize = None
+
+def setSqlitePragmas(conn, connection_rec):
+    """
+    A database event listener which configures every new sqlite
+    connection (currently, it sets the memory-mapped I/O size from
+    sqliteMmapSize).  SQLite versions without mmap support ignore the pragma.
+
+    see:    http://docs.sqlalchemy.org/en/latest/core/events.html
+    """
+
+    if sqliteMmapSize is not None:
+        conn.execute("PRAGMA mmap_size=%d" % sqliteMmapSize)
+
 #------------------------------------------------------------
 # Iterator for database chunks
 
 class ChunkIterator(object):
     """Iterator for query chunks"""
+
+    # one of these is created for every query, so do not give every
+    # instance a __dict__
+    __slots__ = ('dbobj', 'exec_query', 'chunk_size', 'arbitrarySQL', 'colnames',
+                 '_fetchmany', '_postprocess')
+
+    # When chunk_size is None, all of the results are returned in one array,
+    # but they are still fetched from the database (and converted to numpy)
+    # this many rows at a time, so that the full result set never has to be
+    # held as a list of python rows.
+    streamingChunkSize = 100000
+
     def __init__(self, dbobj, query, chunk_size, arbitrarySQL = False):
         self.dbobj = dbobj
-        self.exec_query = dbobj.connection.session.execute(query)
+
+        # Ask for a server-side cursor so that the DBAPI does not buffer the
+        # whole result set on the client.  Drivers that do not support this
+        # (e.g. sqlite) ignore the option.
+        if isinstance(query, basestring):
+            statement = expression.text(query)
+        else:
+            statement = query.statement
+        statement = statement.execution_options(stream_results=True)
+
+        self.exec_query = dbobj.connection.session.execute(statement)
         self.chunk_size = chunk_size
 
+        #The column names are looked up once here and passed to the
+        #postprocess methods along with every chunk.
+        self.colnames = tuple([str(k) for k in self.exec_query.keys()])
+
+        #On sqlite, rows are read straight from the DBAPI cursor as plain
+        #tuples rather than as sqlalchemy RowProxy objects.  sqlite already
+        #hands back python types that numpy can take directly.  Other
+        #backends (e.g. mssql+pymssql) go through the ResultProxy, whose
+        #result processors handle Decimal, Unicode and other type coercion.
+        if dbobj.connection.engine.dialect.name == 'sqlite':
+            self._fetchmany = self.exec_query.cursor.fetchmany
+        else:
+            self._fetchmany = self.exec_query.fetchmany
+
         #arbitrarySQL exists in case a CatalogDBObject calls
         #get_arbitrary_chunk_iterator; in that case, we need to
         #be able to tell this object to call _postprocess_arbitrary_results,
         #rather than _postprocess_results
         self.arbitrarySQL = arbitrarySQL
 
+        #look up the method that converts chunks to numpy once, rather than per chunk
+        if self.arbitrarySQL:
+            self._postprocess = dbobj._postprocess_arbitrary_results
+        else:
+            self._postprocess = dbobj._postprocess_results
+
     def __iter__(self):
         return self
 
     def next(self):
-        if self.chunk_size is None and not self.exec_query.closed:
-            chunk = self.exec_query.fetchall()
-            return self._postprocess_results(chunk)
-        elif self.chunk_size is not None:
-            chunk = self.exec_query.fetchmany(self.chunk_size)
-            return self._postprocess_results(chunk)
+        if self.exec_query.closed:
+            raise StopIteration
+        elif self.chunk_size is None:
+            return self._fetch_all()
         else:
+            chunk = self._fetch_rows(self.chunk_size)
+            return self._postprocess_results(chunk)
+
+    #python 3 name of the iterator protocol method
+    __next__ = next
+
+    def _fetch_all(self):
+        """
+        Return all of the remaining results as a single recarray, building it
+        streamingChunkSize rows at a time.
+        """
+        chunkList = []
+        while not self.exec_query.closed:
+            chunk = self._fetch_rows(self.streamingChunkSize)
+            if len(chunk) > 0:
+                chunkList.append(self._postprocess_results(chunk))
+
+        if len(chunkList) == 0:
             raise StopIteration
+        elif len(chunkList) == 1:
+            return chunkList[0]
+        return numpy.concatenate(chunkList).view(numpy.recarray)
+
+    def _fetch_rows(self, nRows):
+        """
+        Fetch up to nRows rows from the result, closing it once it is
+        exhausted.
+        """
+        chunk = self._fetchmany(nRows)
+        if len(chunk) == 0:
+            self.exec_query.close()
+        return chunk
 
     def _postprocess_results(self, chunk):
         if len(chunk)==0:
             raise StopIteration
-        if self.arbitrarySQL:
-            return self.dbobj._postprocess_arbitrary_results(chunk)
-        else:
-            return self.dbobj._postprocess_results(chunk)
+        return self._postprocess(chunk, colnames=self.colnames)
 
 
 class DBConnection(object):
@@ -110,7 +199,13 @@ class DBConnection(object):
         self._verbose = verbose
 
         self._validate_conn_params()
-        self._connect_to_engine()
+
+        #The engine, session and metadata are only created when one of them
+        #is first used (see the properties below), so that constructing a
+        #DBConnection (or a DBObject) that is never queried costs nothing.
+        self._engine = None
+        self._session = None
+        self._metadata = None
 
 
     def _connect_to_engine(self):
@@ -136,6 +231,8 @@ class DBConnection(object):
         self._engine = create_engine(dbUrl, echo=self._verbose)
 
         if self._engine.dialect.name == 'sqlite':
+            if sqliteMmapSize is not None:
+                event.listen(self._engine, 'connect', setSqlitePragmas)
             event.listen(self._engine, 'checkout', declareTrigFunctions)
 
         self._session = scoped_session(sessionmaker(autoflush=True,
@@ -197,15 +294,21 @@ class DBConnection(object):
 
     @property
     def engine(self):
+        if self._engine is None:
+            self._connect_to_engine()
         return self._engine
 
     @property
     def session(self):
+        if self._session is None:
+            self._connect_to_engine()
         return self._session
 
 
     @property
     def metadata(self):
+        if self._metadata is None:
+            self._connect_to_engine()
         return self._metadata
 
     @property
@@ -315,14 +418,30 @@ class DBObject(object):
         """
         return results
 
-    def _postprocess_results(self, results):
+    def _postprocess_results(self, results, colnames=None):
         """
         This wrapper exists so that a ChunkIterator built from a DBObject
         can have the same API as a ChunkIterator built from a CatalogDBObject
         """
-        return self._postprocess_arbitrary_results(results)
+        return self._postprocess_arbitrary_results(results, colnames=colnames)
+
+    def _postprocess_arbitrary_results(self, results, colnames=None):
+        """
+        Put the results of an arbitrary query in a recarray of dtype self.dtype
+        (which is guessed from the first row if it is None).
+
+        results is either a list of sqlalchemy RowProxys or, if colnames
+        (the names of the columns in the query) is given, a list of
+        tuples as returned by the DBAPI cursor.
+        """
 
-    def _postprocess_arbitrary_results(self, results):
+        if len(results) == 0:
+            if self.dtype is None:
+                #there is no row to guess the types from; name the columns, at least
+                if colnames is not None:
+                    return numpy.recarray((0,), dtype=[(str(ww), float) for ww in colnames])
+                return numpy.recarray((0,), dtype=float)
+            return numpy.recarray((0,), dtype = self.dtype)
 
         if self.dtype is None:
             """
@@ -334,13 +453,13 @@ class DBObject(object):
                 if dataString is not '':
                     dataString+=','
                 dataString += str(xx)
-            names = [str(ww) for ww in results[0].keys()]
+            if colnames is None:
+                names = [str(ww) for ww in results[0].keys()]
+            else:
+                names = list(colnames)
             dataArr = numpy.genfromtxt(StringIO(dataString), dtype=None, names=names, delimiter=',')
             self.dtype = dataArr.dtype
 
-        if len(results) == 0:
-            return numpy.recarray((0,), dtype = self.dtype)
-
         retresults = numpy.rec.fromrecords([tuple(xx) for xx in results],dtype = self.dtype)
         return self._final_pass(retresults)
 
@@ -361,7 +480,13 @@ class DBObject(object):
                 raise RuntimeError("query made to DBObject execute contained %s " % badCommand)
 
         self.dtype = dtype
-        retresults = self._postprocess_arbitrary_results(self.connection.session.execute(query).fetchall())
+        #read the results through a ChunkIterator, which takes them from the cursor
+        #ChunkIterator.streamingChunkSize rows at a time, rather than with one fetchall
+        chunkIter = ChunkIterator(self, query, None, arbitrarySQL = True)
+        try:
+            retresults = chunkIter.next()
+        except StopIteration:
+            retresults = self._postprocess_arbitrary_results([], colnames=chunkIter.colnames)
         return retresults
 
     def get_arbitrary_chunk_iterator(self, query, chunk_size = None, dtype =None):
@@ -451,6 +576,15 @@ class CatalogDBObjectMeta(type):
 class CatalogDBObject(DBObject):
     """Database Object base class
 
+    raColName and decColName are used to build the WHERE clause applied
+    by spatial bounds (see filter).  They should be bare columns of the
+    table (not SQL expressions such as 'ra*PI()/180.') and, for large
+    tables, the database should have an index on them, e.g.
+
+        CREATE INDEX ra_dec_idx ON tableid (raCol, decCol)
+
+    otherwise every spatial query is a full table scan.  Unit conversions
+    belong in the `columns` list, which only affects the SELECT.
     """
     __metaclass__ = CatalogDBObjectMeta
 
@@ -460,12 +594,31 @@ class CatalogDBObject(DBObject):
     tableid = None
     idColKey = None
     objectTypeId = None
+
+    #List of (name, database expression[, type[, length]]) tuples.  A database
+    #expression of None means the database column called name.  The type (and,
+    #for strings, the length) sets the dtype of the returned column and
+    #defaults to float.  It may be any numpy type, so e.g. magnitudes can be
+    #returned as 32 bit floats with ('umag', None, numpy.float32), halving
+    #the size of the result arrays.
     columns = None
     generateDefaultColumnMap = True
     dbDefaultValues = {}
+
+    #chunk_size used by query_columns when none is given.  Classes for large
+    #tables should set this so that unchunked queries are returned as an
+    #iterator over chunks rather than read into memory all at once.
+    defaultChunkSize = None
     raColName = None
     decColName = None
 
+    #Names of table columns holding the cartesian unit vector
+    #(cos(dec)*cos(ra), cos(dec)*sin(ra), sin(dec)) of each object.
+    #If set, circular bounds are applied as a dot product against these
+    #columns (which can be indexed and is correct near the poles) instead
+    #of through bounds.to_SQL
+    xyzColNames = None
+
     #Provide information if this object should be tested in the unit test
     doRunTest = False
     testObservationMetaData = None
@@ -546,13 +699,14 @@ class CatalogDBObject(DBObject):
                 message = ''
             raise RuntimeError("Failed to connect to %s: sqlalchemy.%s %s" % (self.connection.engine, e.message, message))
 
+        self._check_spatial_columns()
+
         #Need to do this after the table is instantiated so that
         #the default columns can be filled from the table object.
         if self.generateDefaultColumnMap:
             self._make_default_columns()
         # build column mapping and type mapping dicts from columns
-        self._make_column_map()
-        self._make_type_map()
+        self._make_column_maps()
 
     def show_mapped_columns(self):
         for col in self.columnMap.keys():
@@ -578,15 +732,141 @@ class CatalogDBObject(DBObject):
         return self.objectTypeId
 
     def _get_table(self):
-        self.table = Table(self.tableid, self.connection.metadata,
-                           autoload=True)
+        if self.generateDefaultColumnMap:
+            #the default columns are read from the table, so it has to be reflected
+            self.table = Table(self.tableid, self.connection.metadata,
+                               autoload=True)
+        else:
+            #the table is not reflected, so check that it exists at all
+            #(reflecting a missing table raises the same error)
+            if not self.connection.engine.has_table(self.tableid):
+                raise sa_exc.NoSuchTableError(self.tableid)
+            self.table = self._build_table()
+
+    def _build_table(self):
+        """
+        Construct the Table object from the columns this class already knows
+        about, rather than reflecting it from the database.
+
+        Only the columns which are referenced directly through self.table
+        (the id column, columns in self.columns that map to a column of the
+        same name, and raColName, decColName and xyzColNames if they are bare
+        column names) are declared.  All other entries in self.columns are
+        selected through SQL expressions.
+        If the table has already been defined on this connection's MetaData
+        (e.g. reflected by another CatalogDBObject), it is reused and only
+        extended with any columns it does not have yet.
+        """
+        typeDict = {}
+        bareColumns = {}
+        for el in self.columns:
+            colName = el[1] if el[1] else el[0]
+            typeTuple = el[2:] if len(el) > 2 else (float,)
+            if colName == el[0] or el[0] == self.idColKey:
+                typeDict[colName] = typeTuple
+            if self._identifierPattern.match(colName):
+                bareColumns[colName] = typeTuple
+
+        #the spatial columns are only declared if they are bare column names;
+        #if they are not, _check_spatial_columns warns about it.  A bare name
+        #which is not in the table makes the query fail when it is run.
+        spatialNames = [self.raColName, self.decColName]
+        if self.xyzColNames is not None:
+            spatialNames += list(self.xyzColNames)
+        for colName in spatialNames:
+            if colName is not None and self._identifierPattern.match(colName) \
+               and colName not in typeDict:
+                typeDict[colName] = bareColumns.get(colName, (float,))
+
+        if self.tableid in self.connection.metadata.tables:
+            existing = self.connection.metadata.tables[self.tableid].c
+            typeDict = dict([(k, v) for k, v in typeDict.iteritems() if k not in existing])
+            if len(typeDict) == 0:
+                return self.connection.metadata.tables[self.tableid]
+
+        sqlColumns = [Column(colName, self._get_sql_type(typeDict[colName]))
+                      for colName in sorted(typeDict)]
+        return Table(self.tableid, self.connection.metadata, *sqlColumns,
+                     extend_existing=True)
+
+    #matches database expressions that are just a column name
+    _identifierPattern = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+    @staticmethod
+    def _get_sql_type(typeTuple):
+        """
+        Return the sqlalchemy type corresponding to an entry in typeMap
+        (i.e. a tuple like (int,) or (str, 8))
+        """
+        dtype = numpy.dtype(typeTuple[0]) if len(typeTuple) == 1 else numpy.dtype(typeTuple)
+        if dtype.kind in ('i', 'u'):
+            return satypes.Integer()
+        elif dtype.kind == 'f':
+            return satypes.Float()
+        elif dtype.kind == 'b':
+            return satypes.Boolean()
+        elif dtype.kind == 'S':
+            return satypes.String(dtype.itemsize)
+        elif dtype.kind == 'U':
+            return satypes.Unicode(dtype.itemsize//4)
+        return satypes.NullType()
+
+    def _check_spatial_columns(self):
+        """
+        Warn if raColName or decColName is not a column of the table.
+        Spatial constraints on SQL expressions cannot use an index.
+        """
+        for colName in (self.raColName, self.decColName):
+            if colName is None:
+                continue
+            if self.generateDefaultColumnMap:
+                isColumn = colName in self.table.c
+            else:
+                #a table which is not reflected cannot say which columns exist,
+                #so only check that the name is not an SQL expression
+                isColumn = self._identifierPattern.match(colName) is not None
+            if not isColumn:
+                warnings.warn("%s is not a column of table %s; " % (colName, self.tableid) +
+                              "spatial constraints on it cannot use an index.  "
+                              "Set raColName/decColName to bare (indexed) columns and "
+                              "do any unit conversion in the columns list.")
+
+    def _make_column_maps(self):
+        """
+        Build columnMap (name -> database expression) and typeMap
+        (name -> dtype tuple) from self.columns in a single pass.
+        """
+        # typeMap is only ever looked up by column name, so it does not need
+        # to remember the order of self.columns (columnMap does)
+        self.columnMap = OrderedDict()
+        self.typeMap = {}
+        for el in self.columns:
+            self.columnMap[el[0]] = el[1] if el[1] else el[0]
+            self.typeMap[el[0]] = el[2:] if len(el) > 2 else (float,)
+
+        self._allColumnNames = tuple(self.columnMap)
+        # cache of the labelled column expressions selected for a given
+        # tuple of column names; see _get_column_query
+        self._columnQueryCache = {}
+        # cache of result dtypes keyed on the tuple of returned column names;
+        # see _get_result_dtype
+        self._dtypeCache = {}
+
+    def _get_result_dtype(self, cols):
+        """
+        Return the numpy dtype of a result set whose columns are named cols,
+        together with a list of (index, value) pairs for the columns in cols
+        that have entries in self.dbDefaultValues.
 
-    def _make_column_map(self):
-        self.columnMap = OrderedDict([(el[0], el[1] if el[1] else el[0])
-                                     for el in self.columns])
-    def _make_type_map(self):
-        self.typeMap = OrderedDict([(el[0], el[2:] if len(el)> 2 else (float,))
-                                   for el in self.columns])
+        Every chunk returned by a query has the same columns, so this is
+        computed once per set of columns and cached.
+        """
+        if cols not in self._dtypeCache:
+            dtype = numpy.dtype([(k,)+self.typeMap[k] for k in cols])
+            defaultList = [(ix, self.dbDefaultValues[colName]) for ix, colName in enumerate(cols)
+                           if colName in self.dbDefaultValues]
+            self._dtypeCache[cols] = (dtype, defaultList)
+        return self._dtypeCache[cols]
 
     def _make_default_columns(self):
         if self.columns:
@@ -612,7 +892,25 @@ class CatalogDBObject(DBObject):
     def _get_column_query(self, colnames=None):
         """Given a list of valid column names, return the query object"""
         if colnames is None:
-            colnames = [k for k in self.columnMap]
+            colnames = self._allColumnNames
+        colnames = tuple(colnames)
+
+        # Building the labelled column expressions is the expensive part of
+        # constructing the query, so do it only once for each set of columns.
+        # The Query itself is not cached: it belongs to the (thread-local)
+        # session and is modified by filter(), constraints and limits.
+        if colnames not in self._columnQueryCache:
+            self._columnQueryCache[colnames] = self._get_column_expressions(colnames)
+        columnList = self._columnQueryCache[colnames]
+
+        #pass all of the columns at once; each add_column call would copy the Query
+        return self.connection.session.query(*columnList)
+
+    def _get_column_expressions(self, colnames):
+        """
+        Given a tuple of valid column names, return the list of labelled
+        sqlalchemy column expressions to select, starting with the id column
+        """
         try:
             vals = [self.columnMap[k] for k in colnames]
         except KeyError:
@@ -630,7 +928,7 @@ class CatalogDBObject(DBObject):
         else:
             idLabel = idColName
 
-        query = self.connection.session.query(self.table.c[idColName].label(idLabel))
+        columnList = [self.table.c[idColName].label(idLabel)]
 
         for col, val in zip(colnames, vals):
             if val is idColName:
@@ -638,27 +936,85 @@ class CatalogDBObject(DBObject):
             #Check if the column is a default column (col == val)
             if col == val:
                 #If column is in the table, use it.
-                query = query.add_column(self.table.c[col].label(col))
+                columnList.append(self.table.c[col].label(col))
             else:
                 #If not assume the user specified the column correctly
-                query = query.add_column(expression.literal_column(val).label(col))
+                columnList.append(expression.literal_column(val).label(col))
 
-        return query
+        return columnList
 
     def filter(self, query, bounds):
-        """Filter the query by the associated metadata"""
+        """Filter the query by the associated metadata
+
+        bounds.to_SQL may return either a SQL string or a sqlalchemy
+        ClauseElement (e.g. one built with bound parameters, which lets the
+        database reuse its query plan); both are accepted.
+        """
         if bounds is not None:
-            on_clause = bounds.to_SQL(self.raColName,self.decColName)
+            if self.xyzColNames is not None and bounds.boundType == 'circle':
+                on_clause = self._xyz_circle_constraint(bounds)
+            else:
+                on_clause = bounds.to_SQL(self.raColName,self.decColName)
+            if isinstance(on_clause, basestring):
+                on_clause = expression.text(on_clause)
             query = query.filter(on_clause)
         return query
 
-    def _postprocess_results(self, results):
+    def _xyz_circle_constraint(self, bounds):
+        """
+        Return a ClauseElement selecting the objects within a circular bounds.
+
+        An object at unit vector (x, y, z) is within radius of the center
+        (cx, cy, cz) of the circle if x*cx + y*cy + z*cz > cos(radius).
+        The center and cos(radius) are computed here, once per query, and
+        passed to the database as bound parameters.
+
+        Each coordinate of such an object also differs from the center's by
+        no more than the chord length 2*sin(radius/2), so the clause includes
+        a BETWEEN range on each column as well.  These do not change the
+        result, but let the database use an index on the xyz columns instead
+        of evaluating the dot product for every row.
+
+        **Parameters**
+
+            * bounds : a CircleBounds whose RA, DEC and radius are in radians
+
+        **Returns**
+
+            * on_clause : a ClauseElement to be passed to Query.filter
+        """
+        cosDec = numpy.cos(bounds.DEC)
+        center = (cosDec*numpy.cos(bounds.RA), cosDec*numpy.sin(bounds.RA),
+                  numpy.sin(bounds.DEC))
+
+        xCol, yCol, zCol = [self.table.c[name] for name in self.xyzColNames]
+
+        on_clause = (xCol*expression.bindparam('xyzCenterX', float(center[0])) +
+                     yCol*expression.bindparam('xyzCenterY', float(center[1])) +
+                     zCol*expression.bindparam('xyzCenterZ', float(center[2])) >
+                     expression.bindparam('xyzCosRadius', float(numpy.cos(bounds.radius))))
+
+        # a little slack so that round-off cannot exclude points the dot product keeps
+        chord = 2.0*numpy.sin(0.5*bounds.radius) + 1.0e-10
+        if bounds.radius < numpy.pi:
+            ranges = [col.between(expression.bindparam('xyzMin%s' % axis, float(cc - chord)),
+                                  expression.bindparam('xyzMax%s' % axis, float(cc + chord)))
+                      for col, cc, axis in zip((xCol, yCol, zCol), center, ('X', 'Y', 'Z'))]
+            on_clause = expression.and_(*(ranges + [on_clause]))
+
+        return on_clause
+
+    def _postprocess_results(self, results, colnames=None):
         """Post-process the query results to put them
         in a structured array.
 
         **Parameters**
 
             * results : a result set as returned by execution of the query
+            * colnames : the names of the columns of results, in order (optional).
+              If given, results may be a list of plain tuples (e.g. rows
+              from the DBAPI cursor); if not, results must be sqlalchemy
+              RowProxys, from which the column names are read.
 
         **Returns**
 
@@ -666,30 +1022,42 @@ class CatalogDBObject(DBObject):
               structured array constructed from the query data.
         """
 
-        if len(results) > 0:
-            cols = [str(k) for k in results[0].keys()]
-        else:
+        if len(results) == 0:
             return results
+        elif colnames is None:
+            cols = tuple([str(k) for k in results[0].keys()])
+        else:
+            cols = tuple(colnames)
 
-        dtype = numpy.dtype([(k,)+self.typeMap[k] for k in cols])
-
-        if len(set(cols)&set(self.dbDefaultValues)) > 0:
+        dtype, defaultList = self._get_result_dtype(cols)
 
-            results_array = []
+        if len(defaultList) > 0:
+            # Fill in the default values a column at a time: lay the rows out
+            # in a 2-D object array, replace the null (or otherwise false)
+            # entries of each column with a default, then build the
+            # structured array from the columns.
+            objArray = numpy.empty((len(results), len(cols)), dtype=object)
+            objArray[:] = [tuple(result) for result in results]
 
-            for result in results:
-                results_array.append([
-                                      result[colName] if result[colName] or colName not in self.dbDefaultValues
-                                      else self.dbDefaultValues[colName] for colName in cols
-                                     ])
+            for ix, defaultValue in defaultList:
+                column = objArray[:, ix]
+                column[numpy.logical_not(column.astype(bool))] = defaultValue
 
+            retresults = numpy.rec.fromarrays([objArray[:, ix] for ix in range(len(cols))],
+                                              dtype=dtype)
         else:
-            results_array = results
-        retresults = numpy.rec.fromrecords(results_array, dtype=dtype)
+            # Rows read from the DBAPI cursor are already tuples, which numpy
+            # turns into a structured array in a single call; sqlalchemy
+            # RowProxys have to be converted first.
+            if not isinstance(results[0], tuple):
+                results = [tuple(result) for result in results]
+            retresults = numpy.array(results, dtype=dtype).view(numpy.recarray)
+
         return self._final_pass(retresults)
 
     def query_columns(self, colnames=None, chunk_size=None,
-                      obs_metadata=None, constraint=None, limit=None):
+                      obs_metadata=None, constraint=None, limit=None,
+                      count_only=False):
         """Execute a query
 
         **Parameters**
@@ -701,7 +1069,8 @@ class CatalogDBObject(DBObject):
             * chunk_size : int (optional)
               if specified, then return an iterator object to query the database,
               each time returning the next `chunk_size` elements.  If not
-              specified, all matching results will be returned.
+              specified, the class attribute `defaultChunkSize` is used; if
+              that is also None, all matching results will be returned.
             * obs_metadata : object (optional)
               an observation metadata object which has a "filter" method, which
               will add a filter string to the query.
@@ -709,6 +1078,10 @@ class CatalogDBObject(DBObject):
               a string which is interpreted as SQL and used as a predicate on the query
             * limit : int (optional)
               limits the number of rows returned by the query
+            * count_only : bool (optional)
+              if True, do not return the matching rows; return only the
+              number of them (computed by the database with COUNT).
+              colnames and chunk_size are ignored.
 
         **Returns**
 
@@ -716,8 +1089,13 @@ class CatalogDBObject(DBObject):
               If chunk_size is not specified, then result is a list of all
               items which match the specified query.  If chunk_size is specified,
               then result is an iterator over lists of the given size.
+              If count_only is True, result is an int.
 
         """
+        if count_only:
+            #only the id column is needed to count rows
+            colnames = [self.idColKey]
+
         query = self._get_column_query(colnames)
 
         if obs_metadata is not None:
@@ -729,6 +1107,12 @@ class CatalogDBObject(DBObject):
         if limit is not None:
             query = query.limit(limit)
 
+        if count_only:
+            return query.count()
+
+        if chunk_size is None:
+            chunk_size = self.defaultChunkSize
+
         return ChunkIterator(self, query, chunk_size)
 
 class fileDBObject(CatalogDBObject):
@@ -777,14 +1161,14 @@ class fileDBObject(CatalogDBObject):
                                     self.connection.engine, self.connection.metadata, numGuess,
                                     indexCols=self.indexCols, **kwargs)
             self._get_table()
+            self._check_spatial_columns()
         else:
             raise ValueError("Could not locate file %s."%(dataLocatorString))
 
         if self.generateDefaultColumnMap:
             self._make_default_columns()
 
-        self._make_column_map()
-        self._make_type_map()
+        self._make_column_maps()
 
     @classmethod
     def from_objid(cls, objid, *args, **kwargs):
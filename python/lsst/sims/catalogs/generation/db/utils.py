@@ -46,7 +46,7 @@ def createSQLTable(dtype, tableid, idCol, metadata, customTypeMap={}, defaultPre
         try:
             nativeTypes[name] = npTypeMap[dtype[name].char]
         except KeyError:
-            warings.warn("No mapping available for column %s (%s).  It will not be included in the autoloaded database.\n"\
+            warnings.warn("No mapping available for column %s (%s).  It will not be included in the autoloaded database.\n"\
                          "You may be able to fix this by passing a custom dtype to the class constructor."%(name, dtype[name]))
             continue
     sqlColumns = []
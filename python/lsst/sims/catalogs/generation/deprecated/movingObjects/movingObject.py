@@ -35,6 +35,16 @@ from DayMOPSObject import DayMOPSObject
 import numpy as n
 import pyoorb as oo
 
+# pyoorb needs oorb_init called exactly once per process - done through _ensureOorbInit
+_oorbInitialized = False
+
+def _ensureOorbInit(ephem_datfile=""):
+    """ Call pyoorb's oorb_init, unless it has already been called in this process """
+    global _oorbInitialized
+    if not _oorbInitialized:
+        oo.pyoorb.oorb_init(ephemeris_fname=ephem_datfile)
+        _oorbInitialized = True
+
 
 class MovingObject(DayMOPSObject):
     #DayMOPSObject provides automatic getters and setters based on "private" (_prefixed) variable names.
@@ -103,19 +113,22 @@ class MovingObject(DayMOPSObject):
             # 9: timescale for the epoch; 1= MJD_UTC, 2=UT1, 3=TT, 4=TAI
             # 10: H
             # 11: G
-            orbitsArray = n.empty([1, 12], dtype=n.double, order='F')            
-            orbitsArray[0][:] = [self.getobjid(),
-                                 self.Orbit.getq(), 
-                                 self.Orbit.gete(),
-                                 n.radians(self.Orbit.geti()),
-                                 n.radians(self.Orbit.getnode()),
-                                 n.radians(self.Orbit.getargPeri()),
-                                 self.Orbit.gettimePeri(),
-                                 n.double(2),
-                                 self.Orbit.getepoch(),
-                                 self.Orbit.getorb_timescale(),
-                                 self.getmagHv(),
-                                 self.getphaseGv()] 
+            orbitsArray = n.empty([1, 12], dtype=n.double, order='F')
+            # fill each slot directly, rather than building (and converting) a list of all 12 values.
+            orbit = self.Orbit
+            row = orbitsArray[0]
+            row[0] = self.getobjid()
+            row[1] = orbit.getq()
+            row[2] = orbit.gete()
+            row[3] = n.radians(orbit.geti())
+            row[4] = n.radians(orbit.getnode())
+            row[5] = n.radians(orbit.getargPeri())
+            row[6] = orbit.gettimePeri()
+            row[7] = 2
+            row[8] = orbit.getepoch()
+            row[9] = orbit.getorb_timescale()
+            row[10] = self.getmagHv()
+            row[11] = self.getphaseGv()
             return orbitsArray
         else:
             # User requested format other than COM so we will currently return an exception.
@@ -136,14 +149,13 @@ class MovingObject(DayMOPSObject):
         # Get orbit in pyoorb array format. 
         orbArray = self.getOrbArrayPyoorb()
         # Set up ephem_dates array for pyoorb.
-        ephem_dates = n.zeros([len(mjdTaiList),2], dtype=n.double, order='F')
-        for i in range(len(mjdTaiList)):
-            # The second element in dates is the units timescale of time .. 
-            # UTC/UT1/TT/TAI = 1/2/3/4.
-            ephem_dates[i][:] = [mjdTaiList[i], eph_timescale]
-        # Calculate the ephemerides with a call to pyoorb.
-        # This assumes that somewhere you've set up pyoorb with a previous call to
-        # oo.pyoorb.oorb_init(ephemeris_fname=ephem_datfile)
+        ephem_dates = n.empty([len(mjdTaiList),2], dtype=n.double, order='F')
+        ephem_dates[:,0] = mjdTaiList
+        # The second element in dates is the units timescale of time .. 
+        # UTC/UT1/TT/TAI = 1/2/3/4.
+        ephem_dates[:,1] = eph_timescale
+        # Calculate the ephemerides with a call to pyoorb (initializing pyoorb first if needed).
+        _ensureOorbInit()
         ephems, err = oo.pyoorb.oorb_ephemeris(in_orbits = orbArray,
                                                in_obscode = obscode,
                                                in_date_ephems = ephem_dates)
@@ -79,7 +79,7 @@ def buildMovingObjectCatalog(ra_fov, dec_fov, radius_fov, mjdTai, filt,
         # de405.dat found from your environment variables, unless changed here
         # this should return 0 if no errors
         ephem_datfile = ""
-        oo.pyoorb.oorb_init(ephemeris_fname=ephem_datfile)
+        mo._ensureOorbInit(ephem_datfile)
                             
 
     ## debugging output
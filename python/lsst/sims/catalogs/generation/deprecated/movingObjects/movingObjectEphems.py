@@ -22,7 +22,7 @@ def process_objlist(infilename, outfilename):
     
     # initialize JPL ephemerides for oorb
     ephem_datfile = ""
-    oo.pyoorb.oorb_init(ephemeris_fname=ephem_datfile)
+    mo._ensureOorbInit(ephem_datfile)
 
     # read input file and process objects / times for each object into dictionary of time lists
     filein = open(infilename, 'r')
@@ -14,17 +14,26 @@ an aggregated bunch of MovingObjects than on the independent MovingObjects thems
 This uses pyoorb, which needs to be EXPLICITLY INITIALIZED with a call to 
 pyoorb.pyoorb.oorb_init()
 this must be done EXACTLY ONCE through the life of the process;
-whether this is to be done eventually in an __init__ file or by the
-end user explicitly in a __main__ is not yet decided.
+movingObject._ensureOorbInit takes care of this, the first time ephemerides are generated.
 
 """
 
+import itertools
+import multiprocessing
 import warnings as warning
 import numpy as n
 import pyoorb as oo
 import movingObject as mo
 
 
+def _oorbEphemeris(args):
+    """ Run pyoorb.oorb_ephemeris on (orbitsArray, obscode, ephem_dates) in a worker process """
+    orbitsArray, obscode, ephem_dates = args
+    return oo.pyoorb.oorb_ephemeris(in_orbits = n.asfortranarray(orbitsArray),
+                                    in_obscode = obscode,
+                                    in_date_ephems = n.asfortranarray(ephem_dates))
+
+
 class MovingObjectList(object):
 
     """
@@ -35,8 +44,15 @@ class MovingObjectList(object):
     efficient because this way we only need to make one call to
     Fortran-land, handing OOrb a large array of orbits.
 
+    The methods that work on all objects at one date gather the ephemeris
+    values they need into arrays (aligned with the list of objects) from
+    the Ephemeris objects each time, so they always see the current values,
+    even if another list sharing the same MovingObjects has updated them.
+
     """
     def __init__(self, objectList=None):
+        # pyoorb orbitsArray for self._mObjects, built on first use by _buildOrbitsArray
+        self._orbitsArrayCache = None
         if objectList == None:
             self._mObjects = None
         else:
@@ -50,6 +66,7 @@ class MovingObjectList(object):
         self._verifyIsMovingObjectList(mObjects)
         # mObjects is a 'normal' square bracket list
         self._mObjects = mObjects
+        self._orbitsArrayCache = None
         return
 
     def addMovingObjectList(self, new_mObjList):
@@ -57,8 +74,13 @@ class MovingObjectList(object):
         new_mObjects should be a MovingObjectList, with a _mObjects property
         """
         self._verifyIsMovingObjectList(new_mObjList._mObjects)
-        for movingobj in new_mObjList._mObjects:
-            self._mObjects.append(movingobj)
+        if self._orbitsArrayCache is not None:
+            # keep the orbits already gathered for pyoorb, and only add those of the new objects
+            if new_mObjList._orbitsArrayCache is None:
+                new_mObjList._orbitsArrayCache = new_mObjList._buildOrbitsArray()
+            self._orbitsArrayCache = n.asfortranarray(n.concatenate([self._orbitsArrayCache,
+                                                                      new_mObjList._orbitsArrayCache]))
+        self._mObjects.extend(new_mObjList._mObjects)
         return
 
     def countList(self):
@@ -69,7 +91,8 @@ class MovingObjectList(object):
         return count
 
     def getList(self):
-        return copy(self._mObjects)
+        # shallow copy; the MovingObjects themselves are shared
+        return list(self._mObjects)
 
 
     def _verifyIsMovingObjectList(self, objectList):
@@ -83,82 +106,129 @@ class MovingObjectList(object):
                 raise TypeException(errStr)
     
 
-    def generateEphemeridesForAllObjects(self, mjdTaiList, obscode=807):
+    def _mjdTaiListStr(self, mjdTaiList):
+        """ Return mjdTaiList (as a list, if given a single date) and the matching ephemeris dictionary keys.
+
+        The keys are the same for all objects, so they are only made once per date, not once per object and date.
+        """
+        if isinstance(mjdTaiList, list) == False:
+            mjdTaiList = [mjdTaiList]
+        mjdTaiStr = self._mObjects[0].mjdTaiStr
+        return mjdTaiList, [mjdTaiStr(mjdTai) for mjdTai in mjdTaiList]
+
+    def _getEphemColumn(self, mjdTaiStr, name):
+        """ Return the array of ephemeris value 'name' (e.g. 'ra', 'snr') of all objects at mjdTaiStr.
+
+        The values are collected from the Ephemeris objects of the individual moving objects
+        on every call (values not set become NaN).
+        """
+        getter = 'get' + name
+        return n.array([getattr(movingobj.Ephemerides[mjdTaiStr], getter)() for movingobj in self._mObjects],
+                       dtype=n.double)
+
+    def _buildOrbitsArray(self):
+        """ Build the (Fortran-ordered) array of orbits pyoorb takes for all objects in the list.
+
+        The result is cached by generateEphemeridesForAllObjects, extended by addMovingObjectList and
+        thrown away by setList; orbits are assumed not to change in between.
+        """
+        # set up an array for pyoorb. it takes:
+        # 0: orbitId
+        # 1 - 6: orbital elements, using radians for angles
+        # 7: element type code, where 2 = cometary - means timescale is TT, too
+        # 8: epoch
+        # 9: timescale for the epoch; 1= MJD_UTC, 2=UT1, 3=TT, 4=TAI
+        # 10: H
+        # 11: G
+        # gather the elements of all moving objects in one pass, in degrees for now.
+        elements = [(movingobj.getobjid(), orbit.getq(), orbit.gete(),
+                     orbit.geti(), orbit.getnode(), orbit.getargPeri(),
+                     orbit.gettimePeri(), 2, orbit.getepoch(), orbit.getorb_timescale(),
+                     movingobj.getmagHv(), movingobj.getphaseGv())
+                    for movingobj, orbit in zip(self._mObjects, [m.Orbit for m in self._mObjects])]
+        orbitsArray = n.array(elements, dtype=n.double, order='F').reshape((len(elements), 12), order='F')
+        # then convert the angles (i, node, argPeri) to radians for all objects at once
+        orbitsArray[:,3:6] = n.radians(orbitsArray[:,3:6])
+        return orbitsArray
+
+    def generateEphemeridesForAllObjects(self, mjdTaiList, obscode=807, nProcs=1):
         """ generates ephemerides for all sources in the source list
         at the specified MJD(s) in mjdTaiList and obscode.  
         ephemerides are stored in ephemeride dictionary associated with each object.
         currently, all dates are ASSUMED to be MJD_TAI  (need to change 'timescale' if not)
+        if nProcs > 1, the orbits are split into nProcs chunks which pyoorb runs on in
+        separate processes (nProcs=None uses all cpus).
         """
         # convert float mjdTai's into strings for dictionary lookup
-        movingobj = self._mObjects[0]
-        mjdTaiListStr = []
-        if isinstance(mjdTaiList, list) == False:
-            mjdTaiList = [mjdTaiList]
-        for mjdTai in mjdTaiList:
-            mjdTaiListStr.append(movingobj.mjdTaiStr(mjdTai))
-            # mjdTaiListStr will be the same for all objects
-
-        # set up array to hold orbital information from all moving objects
-        orbitsArray = n.empty([len(self._mObjects), 12], dtype=n.double, order='F')
-        # loop through objects to populate orbitsArray for ephemeris generation
-        for i in range(len(self._mObjects)):
-            movingobj = self._mObjects[i]
-            objid = movingobj.getobjid()
-            elements = movingobj.Orbit
-            #set up an array for pyoorb. it takes:
-            # 0: orbitId
-            # 1 - 6: orbital elements, using radians for angles
-            # 7: element type code, where 2 = cometary - means timescale is TT, too
-            # 8: epoch
-            # 9: timescale for the epoch; 1= MJD_UTC, 2=UT1, 3=TT, 4=TAI
-            # 10: H
-            # 11: G
-            orbitsArray[i][:] = [movingobj.getobjid(),
-                                 elements.getq(), 
-                                 elements.gete(),
-                                 n.radians(elements.geti()),
-                                 n.radians(elements.getnode()),
-                                 n.radians(elements.getargPeri()),
-                                 elements.gettimePeri(),
-                                 n.double(2),
-                                 elements.getepoch(),
-                                 elements.getorb_timescale(),
-                                 movingobj.getmagHv(),
-                                 movingobj.getphaseGv()]
+        mjdTaiList, mjdTaiListStr = self._mjdTaiListStr(mjdTaiList)
+
+        # orbital information from all moving objects, in the format pyoorb expects
+        if self._orbitsArrayCache is None:
+            self._orbitsArrayCache = self._buildOrbitsArray()
+        orbitsArray = self._orbitsArrayCache
         # we don't need a covariance matrix for ssm objects (=0) 
         # and the oorb_ephemeris call changes if a covariance exists (to oorb_ephemeris_covariance)
         # set up array to hold ephemeris date information for all moving objects
-        ephem_dates = n.zeros([len(mjdTaiList),2], dtype=n.double, order='F')
-        for i in range(len(mjdTaiList)):
-            ephem_dates[i][:] = [mjdTaiList[i], 4.0]
+        ephem_dates = n.empty([len(mjdTaiList),2], dtype=n.double, order='F')
+        ephem_dates[:,0] = mjdTaiList
+        ephem_dates[:,1] = 4.0
         # timescale; 1 = UTC. 2 = UT1.  3= TT. 4 = TAI 
 
         # now do ephemeris generation for all objects on all dates
         ephem_datfile = ""
-        oo.pyoorb.oorb_init(ephemeris_fname=ephem_datfile)
-
-        ephems, err = oo.pyoorb.oorb_ephemeris(in_orbits = orbitsArray,
-                                               in_obscode = obscode,
-                                               in_date_ephems = ephem_dates)
-        
-        if (err != 0):
-            raise Exception("pyoorb.oorb_ephemeris encountered an error")
+        mo._ensureOorbInit(ephem_datfile)
+
+        if nProcs is None:
+            nProcs = multiprocessing.cpu_count()
+        nProcs = min(nProcs, len(self._mObjects))
+        if nProcs > 1:
+            # each chunk of orbits is independent, so hand them to pyoorb in separate processes
+            chunks = n.array_split(orbitsArray, nProcs, axis=0)
+            pool = multiprocessing.Pool(nProcs, initializer=mo._ensureOorbInit, initargs=(ephem_datfile,))
+            try:
+                results = pool.map(_oorbEphemeris, [(chunk, obscode, ephem_dates) for chunk in chunks])
+            finally:
+                pool.close()
+                pool.join()
+            for chunkEphems, err in results:
+                if (err != 0):
+                    raise Exception("pyoorb.oorb_ephemeris encountered an error")
+            ephems = n.concatenate([chunkEphems for chunkEphems, err in results], axis=0)
+        else:
+            # pyoorb would silently copy arrays that are not in Fortran order; these already are
+            # (so asfortranarray makes no copy here), but make sure of it at the call.
+            ephems, err = oo.pyoorb.oorb_ephemeris(in_orbits = n.asfortranarray(orbitsArray),
+                                                   in_obscode = obscode,
+                                                   in_date_ephems = n.asfortranarray(ephem_dates))
+            if (err != 0):
+                raise Exception("pyoorb.oorb_ephemeris encountered an error")
         
         # ephems contains a 3-D Fortran array of ephemerides, the ephemerides are:
         # distance, ra, dec, mag, ephem mjd, ephem mjd timescale, dradt(sky), ddecdt(sky)
         # per object, per date, 8 elements (shape is OBJ(s)/DATE(s)/VALUES)
+        # pull out each ephemeris value for all objects/dates at once
+        distances = ephems[:,:,0]
+        ras = ephems[:,:,1]
+        decs = ephems[:,:,2]
+        magVs = ephems[:,:,3]
+        # sky motion (including cos(dec) is coord motion), so no /n.cos(n.radians(dec)) here
+        dradts = ephems[:,:,6]
+        ddecdts = ephems[:,:,7]
         # now go back and assign data to individual moving objects (using the string to put back in dictionary)
-        for i in range(len(self._mObjects)):
-            for j in range(len(mjdTaiList)):
-                eph = ephems[i][j]
-                dradt = eph[6]  #/n.cos(n.radians(eph[2]))  -- sky motion (including cos(dec) is coord motion)
-                ddecdt = eph[7]                 
-                self._mObjects[i].Ephemerides[mjdTaiListStr[j]] = mo.Ephemeris(mjdTai=mjdTaiList[j],
-                                                                               ra=eph[1], dec=eph[2],
-                                                                               magV=eph[3],
-                                                                               distance=eph[0],
-                                                                               dradt=dradt, 
-                                                                               ddecdt=ddecdt)
+        # ephems is Fortran-ordered, so the values of all objects at one date are contiguous; go through it
+        # one date at a time, turning each of those columns into a list of floats once.
+        ephemeridesList = [movingobj.Ephemerides for movingobj in self._mObjects]
+        for j in range(len(mjdTaiList)):
+            mjdTai, mjdTaiStr = mjdTaiList[j], mjdTaiListStr[j]
+            distance, ra, dec = distances[:,j].tolist(), ras[:,j].tolist(), decs[:,j].tolist()
+            magV, dradt, ddecdt = magVs[:,j].tolist(), dradts[:,j].tolist(), ddecdts[:,j].tolist()
+            for i in range(len(ephemeridesList)):
+                ephemeridesList[i][mjdTaiStr] = mo.Ephemeris(mjdTai=mjdTai,
+                                                             ra=ra[i], dec=dec[i],
+                                                             magV=magV[i],
+                                                             distance=distance[i],
+                                                             dradt=dradt[i],
+                                                             ddecdt=ddecdt[i])
         # done calculating ephemerides. ephemerides stored in dictionary with movingObjects
         return
 
@@ -166,19 +236,32 @@ class MovingObjectList(object):
         """ Return MovingObjectList of objects within field of view """        
         """  given field of view info in degrees """
         # this method is only applicable to ONE time and one field of view at a time
-        outputList = []        
-        for movingobj in self._mObjects:
-            # check if an ephemeris exists for this night - calculate if necessary 
-            # avoid this warning if possible - method to calc all ephemerides at once much faster
-            try: 
-                movingobj.Ephemerides[movingobj.mjdTaiStr(mjdTai)]
-            except AttributeError:
-                warning.warn('moving object does not have ephemeris on this date')            
-                movingobj.calcEphemeris(mjdTai) 
-            # check if moving object was in the field of view of exposure
-            if movingobj.Ephemerides[movingobj.mjdTaiStr(mjdTai)].isInFieldofView(ra_fov, dec_fov, radius_fov): 
-                # then object was in the field of view
-                outputList.append(movingobj)        
+        if len(self._mObjects) == 0:
+            # (an earlier cut may have left nothing to check)
+            return MovingObjectList([])
+        mjdTaiStr = self._mObjects[0].mjdTaiStr(mjdTai)
+        # check if an ephemeris exists for this night - calculate if necessary 
+        # avoid this warning if possible - method to calc all ephemerides at once much faster
+        missing = [movingobj for movingobj in self._mObjects if not movingobj.Ephemerides.has_key(mjdTaiStr)]
+        if len(missing) > 0:
+            warning.warn('%d moving objects do not have ephemeris on this date' %(len(missing)))
+            MovingObjectList(missing).generateEphemeridesForAllObjects(mjdTai)
+        # check which moving objects were in the field of view of exposure, all at once
+        # (same calculation as Ephemeris.isInFieldofView)
+        ra = self._getEphemColumn(mjdTaiStr, 'ra')
+        dec = self._getEphemColumn(mjdTaiStr, 'dec')
+        deltara = n.abs(ra - ra_fov)
+        # check wrap on delta RA - assume RA/RA_fov already 0-360
+        deltara = n.where(deltara > 180., 360-deltara, deltara)
+        # assume Dec/Dec_fov already -90-90, so deltadec should be ok
+        deltadec = n.abs(dec - dec_fov)
+        # cos(dec) is computed once per call, for all objects at once; it is not kept
+        # between calls because the ephemerides for the date can be regenerated
+        val = n.sin(n.radians(deltadec)/2.0)**2.0 +  \
+        n.cos(n.radians(dec))*n.cos(n.radians(dec_fov))*(n.sin(n.radians(deltara)/2.)**2.0)
+        val = n.degrees(2.0 * n.arcsin(n.sqrt(val)))
+        inFieldofView = (deltadec <= radius_fov) & (val < radius_fov)
+        outputList = list(itertools.compress(self._mObjects, inFieldofView))
         return MovingObjectList(outputList)
 
     def calcAllMags(self, filt, mjdTaiList, rootSEDdir, rootFILTERdir=None, withErrors=True, fiveSigmaLimitingMag=None):
@@ -238,58 +321,65 @@ class MovingObjectList(object):
                sedmag[sedfile][f] = sed[sedfile].calcMag(bandpass[f])
                sedcol[sedfile][f] = sedmag[sedfile][f] - sedmag[sedfile]['V']
         # set up mjdTaiListStr for access to ephemeris dictionaries
-        movingobj = self._mObjects[0]
-        mjdTaiListStr = []
-        if isinstance(mjdTaiList, list) == False:
-            mjdTaiList = [mjdTaiList]
-        for mjdTai in mjdTaiList:
-            mjdTaiListStr.append(movingobj.mjdTaiStr(mjdTai))
-            # mjdTaiListStr will be the same for all objects.
-
-        # now loop through each object and assign appropriate magnitudes values for this observation
-        for movingobj in self._mObjects:
-            # loop through mjdTaiList
-            for mjdTaiStr in mjdTaiListStr:
-                try:  # check ephemerides exist
-                    movingobj.Ephemerides[mjdTaiStr]
-                except AttributeError:
-                    raise Exception("Do not have an ephemeride on date %s" %(mjdTaiStr))
-                vmag = movingobj.Ephemerides[mjdTaiStr].getmagV()
-                sedname = movingobj.getsedname()
-                # Check if sedname in list of known seds.
-                if sed.has_key(sedname)==False:
-                    # HACK  - FIX when catalogs updated
-                    sedname = 'S.dat'
-                    #raise Exception("SED (%s) of moving object (#%d) not in movingObjectList's directory."
-                    #                %(sedname, movingobj.getobjid()))
-                # calculate magnitudes
-                filtmag = vmag + sedcol[sedname][filt]
-                imsimmag = vmag + sedcol[sedname]['imsim']
-                # set filter magnitude in ephemeris 
-                movingobj.Ephemerides[mjdTaiStr].setmagFilter(filtmag)  
-                movingobj.Ephemerides[mjdTaiStr].setmagImsim(imsimmag)
-                # Add SNR measurement if given 5-sigma limiting mag for exposure.
-                if fiveSigmaLimitingMag != None:
-                    flux_ratio = n.power(10, 0.4*(fiveSigmaLimitingMag - filtmag))
-                    snr = 5 * (flux_ratio)
-                    movingobj.Ephemerides[mjdTaiStr].setsnr(snr)                    
-                # Calculate approx errors in ra/dec/mag from magnitude/m5.
-                if withErrors:
-                    if fiveSigmaLimitingMag == None:
-                        raise Exception("To calculate errors, fiveSigmaLimitingMag is needed.")
-                    # calculate error in ra/dec
-                    rgamma = 0.039
-                    # average seeing is 0.7" (or 700 mas)
-                    error_rand = n.sqrt((0.04-rgamma)*flux_ratio + rgamma*flux_ratio*flux_ratio)
-                    ast_error_rand = 700.0 * error_rand
-                    ast_error_sys = 10.0
-                    astrom_error = n.sqrt(ast_error_sys**2 + ast_error_rand**2)
-                    # convert from mas to deg
-                    astrom_error = astrom_error / 100.0 / 60.0/ 60.0
-                    movingobj.Ephemerides[mjdTaiStr].setastErr(astrom_error)
-                    mag_error_sys = 0.005
-                    mag_error = n.sqrt(error_rand**2 + mag_error_sys**2)
-                    movingobj.Ephemerides[mjdTaiStr].setmagErr(mag_error)
+        mjdTaiList, mjdTaiListStr = self._mjdTaiListStr(mjdTaiList)
+
+        # find the colors of each object's SED; these are the same on every date
+        filtcols = n.empty(len(self._mObjects), dtype=n.double)
+        imsimcols = n.empty(len(self._mObjects), dtype=n.double)
+        for k, movingobj in enumerate(self._mObjects):
+            sedname = movingobj.getsedname()
+            # Check if sedname in list of known seds.
+            if sed.has_key(sedname)==False:
+                # HACK  - FIX when catalogs updated
+                sedname = 'S.dat'
+                #raise Exception("SED (%s) of moving object (#%d) not in movingObjectList's directory."
+                #                %(sedname, movingobj.getobjid()))
+            colors = sedcol[sedname]
+            filtcols[k] = colors[filt]
+            imsimcols[k] = colors['imsim']
+        if withErrors and fiveSigmaLimitingMag == None:
+            raise Exception("To calculate errors, fiveSigmaLimitingMag is needed.")
+
+        # now calculate the magnitudes for all objects at once, for each date in mjdTaiList
+        for mjdTaiStr in mjdTaiListStr:
+            try:  # check ephemerides exist
+                vmag = self._getEphemColumn(mjdTaiStr, 'magV')
+            except (KeyError, AttributeError):
+                raise Exception("Do not have an ephemeride on date %s" %(mjdTaiStr))
+            columns = {}
+            # calculate magnitudes
+            columns['magFilter'] = vmag + filtcols
+            columns['magImsim'] = vmag + imsimcols
+            # Add SNR measurement if given 5-sigma limiting mag for exposure.
+            if fiveSigmaLimitingMag != None:
+                flux_ratio = n.power(10, 0.4*(fiveSigmaLimitingMag - columns['magFilter']))
+                columns['snr'] = 5 * (flux_ratio)
+            # Calculate approx errors in ra/dec/mag from magnitude/m5.
+            if withErrors:
+                # calculate error in ra/dec
+                rgamma = 0.039
+                # average seeing is 0.7" (or 700 mas)
+                error_rand = n.sqrt((0.04-rgamma)*flux_ratio + rgamma*flux_ratio*flux_ratio)
+                ast_error_rand = 700.0 * error_rand
+                ast_error_sys = 10.0
+                astrom_error = n.sqrt(ast_error_sys**2 + ast_error_rand**2)
+                # convert from mas to deg
+                columns['astErr'] = astrom_error / 100.0 / 60.0/ 60.0
+                mag_error_sys = 0.005
+                columns['magErr'] = n.sqrt(error_rand**2 + mag_error_sys**2)
+            # set the new values in each object's ephemeris, too
+            ephemList = [movingobj.Ephemerides[mjdTaiStr] for movingobj in self._mObjects]
+            for ephem, magFilter, magImsim in zip(ephemList, columns['magFilter'].tolist(),
+                                                  columns['magImsim'].tolist()):
+                ephem.setmagFilter(magFilter)
+                ephem.setmagImsim(magImsim)
+            if fiveSigmaLimitingMag != None:
+                for ephem, snr in zip(ephemList, columns['snr'].tolist()):
+                    ephem.setsnr(snr)
+            if withErrors:
+                for ephem, astErr, magErr in zip(ephemList, columns['astErr'].tolist(), columns['magErr'].tolist()):
+                    ephem.setastErr(astErr)
+                    ephem.setmagErr(magErr)
             # end of mjdTaiList loop
         return
 
@@ -297,23 +387,23 @@ class MovingObjectList(object):
         """calculate SNR for each object and create new moving object list of objects above the SNR cutoff """
         """ Given five sigma limiting mag for image and SNR cutoff """
         # This method is ONLY applicable to ONE time and ONE five sigma limiting magnitude at once
-        outputList = []
         # Uses SNR generated in calcAllMags when used with error generation. 
         # Check that ephemerides exist and magnitudes/snr calculated on this date
-        movingobj = self._mObjects[0]
-        mjdTaiStr = movingobj.mjdTaiStr(mjdTai)
+        mjdTaiStr = self._mObjects[0].mjdTaiStr(mjdTai)
+        noSNRMessage = "Have an ephemeride for this date (%f), but no SNR yet - calcAllMags first with a 5-sigma limiting magnitude value" %(mjdTai)
         try:
-            movingobj.Ephemerides[mjdTaiStr]
-        except AttributeError:
+            ephemList = [movingobj.Ephemerides[mjdTaiStr] for movingobj in self._mObjects]
+        except (KeyError, AttributeError):
             raise Exception("Need to set up ephemerides and magnitudes for this date (%f) first" %(mjdTai))
-        try: 
-            movingobj.Ephemerides[mjdTaiStr].getsnr()
+        try:
+            snr = n.array([ephem.getsnr() for ephem in ephemList], dtype=n.double)
         except AttributeError:
-            raise Exception("Have an ephemeride for this date (%f), but no SNR yet - calcAllMags first with a 5-sigma limiting magnitude value" %(mjdTai))
-        for movingobj in self._mObjects:
-            if (movingobj.Ephemerides[mjdTaiStr].getsnr() > SNRcutoff):
-                # then object was above the SNR cutoff
-                outputList.append(movingobj)
+            raise Exception(noSNRMessage)
+        if n.isnan(snr).all():
+            raise Exception(noSNRMessage)
+        # then objects above the SNR cutoff
+        aboveCutoff = snr > SNRcutoff
+        outputList = list(itertools.compress(self._mObjects, aboveCutoff))
         return MovingObjectList(outputList)
 
     def printList(self, mjdTaiList):
@@ -321,25 +411,46 @@ class MovingObjectList(object):
         output = ['objid', 'mjdTai', 'ra', 'dec', 'dradt', 'ddecdt', 'distance', 'magImsim', 'magFilter', 'filter']
 
         # set up mjdTaiListStr for access to ephemeris dictionaries
-        movingobj = self._mObjects[0]
-        mjdTaiListStr = []
-        if isinstance(mjdTaiList, list) == False:
-            mjdTaiList = [mjdTaiList]
-        for mjdTai in mjdTaiList:
-            mjdTaiListStr.append(movingobj.mjdTaiStr(mjdTai))
-            # mjdTaiListStr will be the same for all objects
-
-        for mjdTaiStr in mjdTaiListStr:
-            for movingobj in self._mObjects:
-                ephem = movingobj.Ephemerides[mjdTaiStr]
-                print "%d %f %f %f %f %f %f %f %f %s" %(movingobj.getobjid(), 
-                                                        ephem.getra(), ephem.getdec(),
-                                                        ephem.getdradt(), ephem.getddecdt(),
-                                                        ephem.getdistance(), 
-                                                        ephem.getmagImsim(), ephem.getmagFilter(),
-                                                        ephem.getfilter())
+        mjdTaiList, mjdTaiListStr = self._mjdTaiListStr(mjdTaiList)
+
+        objids = [movingobj.getobjid() for movingobj in self._mObjects]
+        for mjdTai, mjdTaiStr in zip(mjdTaiList, mjdTaiListStr):
+            # format all the lines for this date, then print them at once
+            columns = [self._getEphemColumn(mjdTaiStr, name) for name in output[2:-1]]
+            filters = [movingobj.Ephemerides[mjdTaiStr].getfilter() for movingobj in self._mObjects]
+            lines = ["%d %f %f %f %f %f %f %f %f %s" %((objid, mjdTai) + values + (filt,))
+                     for objid, values, filt in zip(objids, zip(*columns), filters)]
+            if len(lines) > 0:
+                print "\n".join(lines)
         return
 
+    def makeRecArrayOutput(self, mjdTai):
+        """ Return a numpy recarray of the ephemeris values of all objects at mjdTai, plus its column names.
+
+        Carries the same information as the list of lists from makeListOutput (except for flux_scale),
+        but builds each column at once instead of one row per object. """
+        descriptionList = ['objid',
+                           'ra', 'ra_err', 'dradt',
+                           'dec', 'dec_err', 'ddecdt',
+                           'distance',
+                           'magFilter', 'magErr',
+                           'magImsim', 'sedname']
+        if self.countList() == 0:
+            warning.warn('No moving objects in this MovingObjectList.')
+            columns = ([n.array([], dtype=int)] + [n.array([], dtype=n.double)]*(len(descriptionList)-2) +
+                       [n.array([], dtype=str)])
+            return n.rec.fromarrays(columns, names=descriptionList), descriptionList
+        mjdTaiStr = self._mObjects[0].mjdTaiStr(mjdTai)
+        astErr = self._getEphemColumn(mjdTaiStr, 'astErr')
+        columns = [n.array([movingobj.getobjid() for movingobj in self._mObjects]),
+                   self._getEphemColumn(mjdTaiStr, 'ra'), astErr, self._getEphemColumn(mjdTaiStr, 'dradt'),
+                   self._getEphemColumn(mjdTaiStr, 'dec'), astErr, self._getEphemColumn(mjdTaiStr, 'ddecdt'),
+                   self._getEphemColumn(mjdTaiStr, 'distance'),
+                   self._getEphemColumn(mjdTaiStr, 'magFilter'), self._getEphemColumn(mjdTaiStr, 'magErr'),
+                   self._getEphemColumn(mjdTaiStr, 'magImsim'),
+                   n.array([movingobj.getsedname() for movingobj in self._mObjects], dtype=str)]
+        return n.rec.fromarrays(columns, names=descriptionList), descriptionList
+
 """
     def makeListOutput_imsim(self, mjdTai):
         # want to send out : 
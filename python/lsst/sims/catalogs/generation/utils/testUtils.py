@@ -27,8 +27,10 @@ def writeResult(result, fname):
         if first:
             fh.write(",".join([str(el) for el in chunk.dtype.names])+"\n")
             first = False
-        for i in xrange(len(chunk)):
-            fh.write(",".join([str(chunk[name][i]) for name in chunk.dtype.names])+"\n")
+        # walk the columns in step rather than selecting chunk[name] again
+        # for every element; str() still sees the same numpy scalars
+        columns = [chunk[name] for name in chunk.dtype.names]
+        fh.writelines([",".join([str(el) for el in row])+"\n" for row in zip(*columns)])
     fh.close()
 
 def sampleSphere(size, ramin = 0., dra = 2.*numpy.pi):
@@ -1,15 +1,28 @@
 from __future__ import with_statement
 import os
 import sqlite3
+import warnings
 
 import unittest, numpy
 import lsst.utils.tests as utilsTests
 from lsst.utils import getPackageDir
 from lsst.sims.utils import ObservationMetaData
 from lsst.sims.catalogs.generation.db import CatalogDBObject, fileDBObject
+import lsst.sims.catalogs.generation.db.dbConnection as dbConnection
 import lsst.sims.catalogs.generation.utils.testUtils as tu
 from lsst.sims.catalogs.generation.utils.testUtils import myTestStars, myTestGals
 from lsst.sims.utils import haversine
+from sqlalchemy.exc import NoSuchTableError
+
+#Keep the test databases in tests/scratchSpace.  When the tests are spread over
+#several processes with pytest-xdist, every worker gets its own copy of the
+#databases, so that one worker cannot delete them while another is still reading.
+_scratchDir = os.path.join(getPackageDir('sims_catalogs_generation'), 'tests', 'scratchSpace')
+_workerTag = os.environ.get('PYTEST_XDIST_WORKER', '')
+if _workerTag:
+    _workerTag = '_' + _workerTag
+starGalDBName = os.path.join(_scratchDir, 'testCatalogDBObjectDatabase%s.db' % _workerTag)
+nonsenseDBName = os.path.join(_scratchDir, 'testCatalogDBObjectNonsenseDB%s.db' % _workerTag)
 
 
 def createNonsenseDB():
@@ -19,10 +32,16 @@ def createNonsenseDB():
     they are supposed to.
     """
     dataDir = os.path.join(getPackageDir('sims_catalogs_generation'), 'tests', 'testData')
-    if os.path.exists('testCatalogDBObjectNonsenseDB.db'):
-        os.unlink('testCatalogDBObjectNonsenseDB.db')
-
-    conn = sqlite3.connect('testCatalogDBObjectNonsenseDB.db')
+    if os.path.exists(nonsenseDBName):
+        os.unlink(nonsenseDBName)
+
+    conn = sqlite3.connect(nonsenseDBName)
+    #this is a throw-away test database, so do not wait on the disk for every write
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('PRAGMA journal_mode=MEMORY')
+    #the page size can only be chosen before the first table is created;
+    #bigger pages mean fewer page reads when the tests scan the tables
+    conn.execute('PRAGMA page_size=32768')
     c = conn.cursor()
     try:
         c.execute('''CREATE TABLE test (id int, ra real, dec real, mag real)''')
@@ -36,16 +55,29 @@ def createNonsenseDB():
     except:
         raise RuntimeError("Error creating database table test2.")
 
-    with open(os.path.join(dataDir, 'CatalogsGenerationTestData.txt'), 'r') as inFile:
-        for line in inFile:
-            values = line.split()
-            cmd = '''INSERT INTO test VALUES (%s, %s, %s, %s)''' % (values[0], values[1], values[2], values[3])
-            c.execute(cmd)
-            if int(values[0])%2 == 0:
-                cmd = '''INSERT INTO test2 VALUES (%s, %s)''' % (values[0], str(2.0*float(values[3])))
-                c.execute(cmd)
-
+    try:
+        c.execute('''CREATE TABLE testXYZ (id int, ra real, dec real, mag real, cx real, cy real, cz real)''')
         conn.commit()
+    except:
+        raise RuntimeError("Error creating database table testXYZ.")
+
+    data = numpy.loadtxt(os.path.join(dataDir, 'CatalogsGenerationTestData.txt'),
+                         dtype=[('id', int), ('ra', float), ('dec', float), ('mag', float)])
+    ra = numpy.radians(data['ra'])
+    dec = numpy.radians(data['dec'])
+    even = data['id']%2 == 0
+
+    #insert all of the rows in one transaction, with bound parameters
+    c.executemany('''INSERT INTO test VALUES (?, ?, ?, ?)''', data.tolist())
+    c.executemany('''INSERT INTO test2 VALUES (?, ?)''',
+                  zip(data['id'][even].tolist(), (2.0*data['mag'][even]).tolist()))
+    c.executemany('''INSERT INTO testXYZ VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                  zip(data['id'].tolist(), data['ra'].tolist(), data['dec'].tolist(), data['mag'].tolist(),
+                      (numpy.cos(dec)*numpy.cos(ra)).tolist(), (numpy.cos(dec)*numpy.sin(ra)).tolist(),
+                      numpy.sin(dec).tolist()))
+    #index the unit vector columns, so that circle bounds on testXYZ can use it
+    c.execute('''CREATE INDEX testXYZ_cxcycz ON testXYZ (cx, cy, cz)''')
+    conn.commit()
 
     try:
         c.execute('''CREATE TABLE queryColumnsTest (i1 int, i2 int, i3 int)''')
@@ -54,10 +86,8 @@ def createNonsenseDB():
         raise RuntimeError("Error creating database table queryColumnsTest.")
 
     with open(os.path.join(dataDir, 'QueryColumnsTestData.txt'), 'r') as inputFile:
-        for line in inputFile:
-            vv = line.split()
-            cmd = '''INSERT INTO queryColumnsTest VALUES (%s, %s, %s)''' % (vv[0], vv[1], vv[2])
-            c.execute(cmd)
+        rows = [tuple(None if vv == 'NULL' else int(vv) for vv in line.split()[:3]) for line in inputFile]
+    c.executemany('''INSERT INTO queryColumnsTest VALUES (?, ?, ?)''', rows)
 
     conn.commit()
     conn.close()
@@ -66,7 +96,7 @@ def createNonsenseDB():
 class dbForQueryColumnsTest(CatalogDBObject):
     objid = 'queryColumnsNonsense'
     tableid = 'queryColumnsTest'
-    database = 'testCatalogDBObjectNonsenseDB.db'
+    database = nonsenseDBName
     idColKey = 'i1'
     dbDefaultValues = {'i2':-1, 'i3':-2}
 
@@ -75,14 +105,114 @@ class myNonsenseDB(CatalogDBObject):
     tableid = 'test'
     idColKey = 'NonsenseId'
     driver = 'sqlite'
-    database = 'testCatalogDBObjectNonsenseDB.db'
+    database = nonsenseDBName
+    raColName = 'ra'
+    decColName = 'dec'
+    columns = [('NonsenseId', 'id', int),
+               ('NonsenseRaJ2000', 'ra*%f'%(numpy.pi/180.)),
+               ('NonsenseDecJ2000', 'dec*%f'%(numpy.pi/180.)),
+               ('NonsenseMag', 'mag', float)]
+
+class myNonsenseXYZDB(CatalogDBObject):
+    """
+    In order to test circular bounds applied to cartesian
+    unit vector columns
+    """
+    objid = 'NonsenseXYZ'
+    tableid = 'testXYZ'
+    idColKey = 'NonsenseId'
+    driver = 'sqlite'
+    database = nonsenseDBName
+    raColName = 'ra'
+    decColName = 'dec'
+    xyzColNames = ('cx', 'cy', 'cz')
+    columns = [('NonsenseId', 'id', int),
+               ('NonsenseRaJ2000', 'ra*%f'%(numpy.pi/180.)),
+               ('NonsenseDecJ2000', 'dec*%f'%(numpy.pi/180.)),
+               ('NonsenseMag', 'mag', float)]
+
+class myNonsenseNoReflectionDB(CatalogDBObject):
+    """
+    In order to test a CatalogDBObject which builds its table
+    from its columns list instead of reflecting it
+    """
+    objid = 'NonsenseNoReflection'
+    tableid = 'test2'
+    idColKey = 'NonsenseId'
+    driver = 'sqlite'
+    database = nonsenseDBName
+    generateDefaultColumnMap = False
+    columns = [('NonsenseId', 'id', int),
+               ('mag', None, float),
+               ('NonsenseHalfMag', '0.5*mag', float)]
+
+class myNonsenseNoReflectionExpressionDB(CatalogDBObject):
+    """
+    In order to test that a CatalogDBObject which builds its table
+    declares bare raColName/decColName, and does not warn about them,
+    when the columns list only uses them inside SQL expressions
+    """
+    objid = 'NonsenseNoReflectionExpression'
+    tableid = 'test'
+    idColKey = 'NonsenseId'
+    driver = 'sqlite'
+    database = nonsenseDBName
+    raColName = 'ra'
+    decColName = 'dec'
+    generateDefaultColumnMap = False
+    columns = [('NonsenseId', 'id', int),
+               ('NonsenseRaJ2000', 'ra*%f'%(numpy.pi/180.)),
+               ('NonsenseDecJ2000', 'dec*%f'%(numpy.pi/180.)),
+               ('NonsenseMag', 'mag', float)]
+
+class myNonsenseNoReflectionSpatialExpressionDB(CatalogDBObject):
+    """
+    In order to test that a CatalogDBObject which builds its table
+    warns when raColName/decColName are SQL expressions
+    """
+    objid = 'NonsenseNoReflectionSpatialExpression'
+    tableid = 'test'
+    idColKey = 'NonsenseId'
+    driver = 'sqlite'
+    database = nonsenseDBName
+    raColName = 'ra*PI()/180.'
+    decColName = 'dec*PI()/180.'
+    generateDefaultColumnMap = False
+    columns = [('NonsenseId', 'id', int),
+               ('NonsenseMag', 'mag', float)]
+
+class myNonsenseNoReflectionXYZDB(CatalogDBObject):
+    """
+    In order to test circular bounds applied to cartesian
+    unit vector columns of a table which is not reflected
+    """
+    objid = 'NonsenseNoReflectionXYZ'
+    tableid = 'testXYZ'
+    idColKey = 'NonsenseId'
+    driver = 'sqlite'
+    database = nonsenseDBName
     raColName = 'ra'
     decColName = 'dec'
+    xyzColNames = ('cx', 'cy', 'cz')
+    generateDefaultColumnMap = False
     columns = [('NonsenseId', 'id', int),
                ('NonsenseRaJ2000', 'ra*%f'%(numpy.pi/180.)),
                ('NonsenseDecJ2000', 'dec*%f'%(numpy.pi/180.)),
                ('NonsenseMag', 'mag', float)]
 
+class myNonsenseNoReflectionMissingDB(CatalogDBObject):
+    """
+    In order to test that a CatalogDBObject which builds its table
+    still fails at construction if the table does not exist
+    """
+    objid = 'NonsenseNoReflectionMissing'
+    tableid = 'noSuchTable'
+    idColKey = 'NonsenseId'
+    driver = 'sqlite'
+    database = nonsenseDBName
+    generateDefaultColumnMap = False
+    columns = [('NonsenseId', 'id', int)]
+
 class myNonsenseDB_noConnection(CatalogDBObject):
     """
     In order to test that we can pass a DBConnection in
@@ -113,80 +243,156 @@ class myNonsenseFileDB(fileDBObject):
 class testCatalogDBObjectTestStars(myTestStars):
     objid = 'testCatalogDBObjectTeststars'
     driver = 'sqlite'
-    database = 'testCatalogDBObjectDatabase.db'
+    database = starGalDBName
 
 class testCatalogDBObjectTestGalaxies(myTestGals):
     objid = 'testCatalogDBObjectTestgals'
     driver = 'sqlite'
-    database = 'testCatalogDBObjectDatabase.db'
+    database = starGalDBName
 
-class CatalogDBObjectTestCase(unittest.TestCase):
+class NonsenseBaselineMixin(object):
+    """
+    Baseline copy of the data in testData/CatalogsGenerationTestData.txt, and the
+    checks made against it, shared by CatalogDBObjectTestCase and fileDBObjectTestCase
+    """
+
+    @classmethod
+    def loadBaseline(cls, filename):
+        """
+        The baseline arrays will store another copy of the data that should be stored in
+        the Nonsense databases.  This will give us something to test database queries
+        against when we ask for all of the objects within a certain box or circle bound.
+        It is only read once (and is read-only), since it is shared by all of the tests.
+        """
+        ids, ra, dec, mag = numpy.loadtxt(filename, unpack=True)
+        cls.baselineIds = ids.astype(int)
+        cls.baselineRa = ra
+        cls.baselineMag = mag
+
+        # the query results come back in radians; convert the baseline positions once
+        cls.raRad = numpy.radians(ra)
+        cls.decRad = numpy.radians(dec)
+
+        for column in (cls.baselineIds, cls.baselineRa, cls.baselineMag, cls.raRad, cls.decRad):
+            column.flags.writeable = False
+
+        # map each id onto its index in the baseline arrays; the ids are small
+        # non-negative integers, so an array indexed by id does the job.  Ids that
+        # are not in the baseline point past the end, so looking them up raises
+        # an IndexError rather than returning some other object's row
+        cls.idToIndex = numpy.empty(cls.baselineIds.max()+1, dtype=int)
+        cls.idToIndex.fill(len(cls.baselineIds))
+        cls.idToIndex[cls.baselineIds] = numpy.arange(len(cls.baselineIds))
+        cls.idToIndex.flags.writeable = False
+
+    @classmethod
+    def deleteBaseline(cls):
+        del cls.baselineIds
+        del cls.baselineRa
+        del cls.baselineMag
+        del cls.raRad
+        del cls.decRad
+        del cls.idToIndex
+
+    def checkChunkAgainstBaseline(self, chunk):
+        """
+        Compare a whole chunk of Nonsense query results against the baseline data
+        at once.  Returns the ids in the chunk.
+        """
+        dex = self.idToIndex[chunk['NonsenseId']]
+        self.assertLess(numpy.abs(chunk['NonsenseRaJ2000'] - self.raRad[dex]).max(), 0.0005)
+        self.assertLess(numpy.abs(chunk['NonsenseDecJ2000'] - self.decRad[dex]).max(), 0.0005)
+        self.assertLess(numpy.abs(chunk['NonsenseMag'] - self.baselineMag[dex]).max(), 0.0005)
+        return chunk['NonsenseId']
+
+    def checkChunkInBox(self, chunk, raMin, raMax, decMin, decMax):
+        """
+        Make sure that every object in a chunk of Nonsense query results is inside
+        the box bound (all limits in radians)
+        """
+        self.assertTrue((chunk['NonsenseRaJ2000'] < raMax).all())
+        self.assertTrue((chunk['NonsenseRaJ2000'] > raMin).all())
+        self.assertTrue((chunk['NonsenseDecJ2000'] < decMax).all())
+        self.assertTrue((chunk['NonsenseDecJ2000'] > decMin).all())
+
+    def outsideBox(self, raMin, raMax, decMin, decMax):
+        """
+        Return a mask of the baseline objects which are outside of the box bound
+        (all limits in radians)
+        """
+        return (self.raRad > raMax) | (self.raRad < raMin) | (self.decRad > decMax) | (self.decRad < decMin)
+
+
+class CatalogDBObjectTestCase(NonsenseBaselineMixin, unittest.TestCase):
 
     @classmethod
     def setUpClass(cls):
         #Delete the test database if it exists and start fresh.
-        if os.path.exists('testCatalogDBObjectDatabase.db'):
-            print "deleting database"
-            os.unlink('testCatalogDBObjectDatabase.db')
-        tu.makeStarTestDB(filename='testCatalogDBObjectDatabase.db', size=5000, seedVal=1)
-        tu.makeGalTestDB(filename='testCatalogDBObjectDatabase.db', size=5000, seedVal=1)
+        if os.path.exists(starGalDBName):
+            os.unlink(starGalDBName)
+        tu.makeStarTestDB(filename=starGalDBName, size=5000, seedVal=1)
+        tu.makeGalTestDB(filename=starGalDBName, size=5000, seedVal=1)
         createNonsenseDB()
 
+        #the tests scan the same small databases over and over, so let sqlite
+        #memory-map them rather than read() every page
+        cls.mmapSize = dbConnection.sqliteMmapSize
+        dbConnection.sqliteMmapSize = 268435456
+
+        #the CatalogDBObjects do not change from test to test, so only
+        #connect and reflect their tables once
+        cls.myStars = CatalogDBObject.from_objid('testCatalogDBObjectTeststars')
+        cls.myGals = CatalogDBObject.from_objid('testCatalogDBObjectTestgals')
+        cls.myNonsense = CatalogDBObject.from_objid('Nonsense')
+
+        cls.filepath = os.path.join(getPackageDir('sims_catalogs_generation'), 'tests', 'testData', 'CatalogsGenerationTestData.txt')
+        cls.loadBaseline(cls.filepath)
+
     @classmethod
     def tearDownClass(cls):
-        if os.path.exists('testCatalogDBObjectDatabase.db'):
-            os.unlink('testCatalogDBObjectDatabase.db')
-        if os.path.exists('testCatalogDBObjectNonsenseDB.db'):
-            os.unlink('testCatalogDBObjectNonsenseDB.db')
+        if os.path.exists(starGalDBName):
+            os.unlink(starGalDBName)
+        if os.path.exists(nonsenseDBName):
+            os.unlink(nonsenseDBName)
+        dbConnection.sqliteMmapSize = cls.mmapSize
+        del cls.mmapSize
+        del cls.myStars
+        del cls.myGals
+        del cls.myNonsense
+        del cls.filepath
+        cls.deleteBaseline()
 
     def setUp(self):
         self.obsMd = ObservationMetaData(pointingRA=210.0, pointingDec=-60.0, boundLength=1.75,
                                          boundType='circle', mjd=52000., bandpassName='r')
 
-        self.filepath = os.path.join(getPackageDir('sims_catalogs_generation'), 'tests', 'testData', 'CatalogsGenerationTestData.txt')
-
-        """
-        baselineData will store another copy of the data that should be stored in
-        testCatalogDBObjectNonsenseDB.db.  This will give us something to test database queries
-        against when we ask for all of the objects within a certain box or circle.
-        """
-
-        self.dtype=[('id', int), ('ra', float), ('dec', float), ('mag', float)]
-        self.baselineData=numpy.loadtxt(self.filepath, dtype=self.dtype)
-
     def tearDown(self):
         del self.obsMd
-        del self.filepath
-        del self.dtype
-        del self.baselineData
 
     def testObsMD(self):
         self.assertEqual(self.obsMd.bandpass, 'r')
         self.assertAlmostEqual(self.obsMd.mjd.TAI, 52000., 6)
 
     def testDbObj(self):
-        mystars = CatalogDBObject.from_objid('testCatalogDBObjectTeststars')
-        mygals = CatalogDBObject.from_objid('testCatalogDBObjectTestgals')
-        result = mystars.query_columns(obs_metadata=self.obsMd)
+        result = self.myStars.query_columns(obs_metadata=self.obsMd)
         tu.writeResult(result, "/dev/null")
-        result = mygals.query_columns(obs_metadata=self.obsMd)
+        result = self.myGals.query_columns(obs_metadata=self.obsMd)
         tu.writeResult(result, "/dev/null")
 
     def testRealQueryConstraints(self):
-        mystars = CatalogDBObject.from_objid('testCatalogDBObjectTeststars')
         mycolumns = ['id', 'raJ2000', 'decJ2000', 'umag', 'gmag', 'rmag', 'imag', 'zmag', 'ymag']
 
         #recall that ra and dec are stored in degrees in the data base
-        myquery = mystars.query_columns(colnames = mycolumns,
-                                        constraint = 'ra < 90. and ra > 45.')
+        myquery = self.myStars.query_columns(colnames = mycolumns,
+                                             constraint = 'ra < 90. and ra > 45.')
 
         tol=1.0e-3
         ct = 0
         for chunk in myquery:
-            for star in chunk:
-                ct += 1
-                self.assertLess(numpy.degrees(star[1]), 90.0+tol)
-                self.assertGreater(numpy.degrees(star[1]), 45.0-tol)
+            ct += len(chunk)
+            raDeg = numpy.degrees(chunk['raJ2000'])
+            self.assertTrue((raDeg < 90.0+tol).all())
+            self.assertTrue((raDeg > 45.0-tol).all())
         self.assertGreater(ct, 0)
 
 
@@ -196,7 +402,58 @@ class CatalogDBObjectTestCase(unittest.TestCase):
         of the objects) within that circle
         """
 
-        myNonsense = CatalogDBObject.from_objid('Nonsense')
+        radius = 20.0
+        raCenter = 210.0
+        decCenter = -60.0
+
+        mycolumns = ['NonsenseId', 'NonsenseRaJ2000', 'NonsenseDecJ2000', 'NonsenseMag']
+
+        circObsMd = ObservationMetaData(boundType='circle', pointingRA=raCenter, pointingDec=decCenter,
+                                        boundLength=radius, mjd=52000., bandpassName='r')
+
+        circQuery = self.myNonsense.query_columns(colnames = mycolumns, obs_metadata=circObsMd, chunk_size=100)
+
+        raCenter = numpy.radians(raCenter)
+        decCenter = numpy.radians(decCenter)
+        radius = numpy.radians(radius)
+
+        goodPoints = []
+
+        ct = 0
+        for chunk in circQuery:
+            ct += len(chunk)
+            distance = haversine(raCenter, decCenter, chunk['NonsenseRaJ2000'], chunk['NonsenseDecJ2000'])
+            self.assertTrue((distance < radius).all())
+
+            #store a list of which objects fell within our circle bound
+            goodPoints.extend(self.checkChunkAgainstBaseline(chunk))
+        self.assertGreater(ct, 0)
+
+        #make sure that all of the points not returned by the query were, in fact, outside of
+        #the circle bound
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        distance = haversine(raCenter, decCenter, self.raRad[notReturned], self.decRad[notReturned])
+        self.assertTrue((distance > radius).all())
+
+
+    def testNonsenseXYZCircularConstraints(self):
+        """
+        Test that a circle bound applied to the cartesian unit vector columns
+        gets all of the objects (and only all of the objects) within that circle
+        """
+        self._checkXYZCircularConstraints(CatalogDBObject.from_objid('NonsenseXYZ'))
+
+
+    def testNonsenseXYZCircularConstraints_noReflection(self):
+        """
+        Test circle bounds on the cartesian unit vector columns of a table
+        which is built from the columns list instead of reflected
+        """
+        self._checkXYZCircularConstraints(CatalogDBObject.from_objid('NonsenseNoReflectionXYZ'))
+
+
+    def _checkXYZCircularConstraints(self, myNonsense):
 
         radius = 20.0
         raCenter = 210.0
@@ -215,43 +472,94 @@ class CatalogDBObjectTestCase(unittest.TestCase):
 
         goodPoints = []
 
-        ct = 0
         for chunk in circQuery:
+            distance = haversine(raCenter, decCenter, chunk['NonsenseRaJ2000'], chunk['NonsenseDecJ2000'])
+            self.assertTrue((distance < radius).all())
+            goodPoints.extend(chunk['NonsenseId'])
+        self.assertGreater(len(goodPoints), 0)
+
+        distance = haversine(raCenter, decCenter, self.raRad, self.decRad)
+        controlPoints = self.baselineIds[numpy.where(distance < radius)]
+        self.assertEqual(sorted(goodPoints), sorted(controlPoints))
+
+
+    def testNoReflection(self):
+        """
+        Test that a CatalogDBObject with generateDefaultColumnMap = False
+        builds its table from its columns list and can be queried
+        """
+        myNonsense = CatalogDBObject.from_objid('NonsenseNoReflection')
+        self.assertEqual(sorted(myNonsense.table.c.keys()), ['id', 'mag'])
+
+        results = myNonsense.query_columns(['NonsenseId', 'mag', 'NonsenseHalfMag'])
+
+        ct = 0
+        for chunk in results:
             for row in chunk:
                 ct += 1
-                distance = haversine(raCenter, decCenter, row[1], row[2])
+                dex = self.idToIndex[row[0]]
+                self.assertEqual(row[0]%2, 0)
+                self.assertAlmostEqual(row[1], 2.0*self.baselineMag[dex], 3)
+                self.assertAlmostEqual(row[2], self.baselineMag[dex], 3)
+        self.assertEqual(ct, len(numpy.where(self.baselineIds%2 == 0)[0]))
 
-                self.assertLess(distance, radius)
 
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
+    def testNoReflectionChecks(self):
+        """
+        Test that a CatalogDBObject which builds its table declares bare
+        spatial columns without warning, warns about spatial columns which
+        are SQL expressions, and fails at construction if its table does not exist
+        """
+        with warnings.catch_warnings(record=True) as warnList:
+            warnings.simplefilter('always')
+            myNonsense = CatalogDBObject.from_objid('NonsenseNoReflectionExpression')
+        self.assertEqual(sorted(myNonsense.table.c.keys()), ['dec', 'id', 'ra'])
+        self.assertEqual(len([ww for ww in warnList if 'is not a column of table' in str(ww.message)]), 0)
 
-                #store a list of which objects fell within our circle bound
-                goodPoints.append(row[0])
+        with warnings.catch_warnings(record=True) as warnList:
+            warnings.simplefilter('always')
+            myNonsense = CatalogDBObject.from_objid('NonsenseNoReflectionSpatialExpression')
+        self.assertEqual(sorted(myNonsense.table.c.keys()), ['id'])
+        self.assertEqual(len([ww for ww in warnList if 'is not a column of table' in str(ww.message)]), 2)
 
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
-        self.assertGreater(ct, 0)
+        self.assertRaises(NoSuchTableError, CatalogDBObject.from_objid, 'NonsenseNoReflectionMissing')
+
+
+    def testNarrowTypes(self):
+        """
+        Test that numpy types given in the columns list set the dtype of the results
+        """
+
+        class myNonsenseFloat32DB(myNonsenseDB):
+            objid = 'NonsenseFloat32'
+            columns = [('NonsenseId', 'id', numpy.int32),
+                       ('NonsenseRaJ2000', 'ra*%f'%(numpy.pi/180.)),
+                       ('NonsenseDecJ2000', 'dec*%f'%(numpy.pi/180.)),
+                       ('NonsenseMag', 'mag', numpy.float32)]
+
+        myNonsense = myNonsenseFloat32DB()
+        mycolumns = ['NonsenseId', 'NonsenseRaJ2000', 'NonsenseMag']
 
         ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            #make sure that all of the points not returned by the query were, in fact, outside of
-            #the circle bound
-            ct += 1
-            distance = haversine(raCenter, decCenter, numpy.radians(entry[1]), numpy.radians(entry[2]))
-            self.assertGreater(distance, radius)
-        self.assertGreater(ct, 0)
+        for chunk in myNonsense.query_columns(colnames=mycolumns, chunk_size=100):
+            self.assertEqual(chunk.dtype['NonsenseId'], numpy.dtype(numpy.int32))
+            self.assertEqual(chunk.dtype['NonsenseRaJ2000'], numpy.dtype(float))
+            self.assertEqual(chunk.dtype['NonsenseMag'], numpy.dtype(numpy.float32))
+            for row in chunk:
+                ct += 1
+                dex = self.idToIndex[row[0]]
+                self.assertAlmostEqual(self.baselineMag[dex], row[2], 3)
+        self.assertEqual(ct, len(self.baselineIds))
 
 
     def testNonsenseSelectOnlySomeColumns(self):
         """
         Test a query performed only a subset of the available columns
         """
-        myNonsense = CatalogDBObject.from_objid('Nonsense')
 
         mycolumns = ['NonsenseId', 'NonsenseRaJ2000', 'NonsenseMag']
 
-        query = myNonsense.query_columns(colnames=mycolumns, constraint = 'ra < 45.', chunk_size=100)
+        query = self.myNonsense.query_columns(colnames=mycolumns, constraint = 'ra < 45.', chunk_size=100)
 
         goodPoints = []
 
@@ -261,20 +569,18 @@ class CatalogDBObjectTestCase(unittest.TestCase):
                 ct += 1
                 self.assertLess(row[1], 45.0)
 
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
+                dex = self.idToIndex[row[0]]
 
                 goodPoints.append(row[0])
 
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[2], 3)
+                self.assertAlmostEqual(self.raRad[dex], row[1], 3)
+                self.assertAlmostEqual(self.baselineMag[dex], row[2], 3)
 
         self.assertGreater(ct, 0)
 
-        ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            self.assertGreater(entry[1], 45.0)
-            ct += 1
-        self.assertGreater(ct, 0)
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        self.assertTrue((self.baselineRa[notReturned] > 45.0).all())
 
 
     def testNonsenseBoxConstraints(self):
@@ -283,8 +589,6 @@ class CatalogDBObjectTestCase(unittest.TestCase):
         points) inside that box bound.
         """
 
-        myNonsense = CatalogDBObject.from_objid('Nonsense')
-
         raMin = 50.0
         raMax = 150.0
         decMax = 30.0
@@ -298,7 +602,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
         boxObsMd = ObservationMetaData(boundType='box', pointingDec=decCenter,  pointingRA=raCenter,
                    boundLength=numpy.array([0.5*(raMax-raMin), 0.5*(decMax-decMin)]), mjd=52000., bandpassName='r')
 
-        boxQuery = myNonsense.query_columns(obs_metadata=boxObsMd, chunk_size=100, colnames=mycolumns)
+        boxQuery = self.myNonsense.query_columns(obs_metadata=boxObsMd, chunk_size=100, colnames=mycolumns)
 
         raMin = numpy.radians(raMin)
         raMax = numpy.radians(raMax)
@@ -309,33 +613,20 @@ class CatalogDBObjectTestCase(unittest.TestCase):
 
         ct = 0
         for chunk in boxQuery:
-            for row in chunk:
-                ct += 1
-                self.assertLess(row[1], raMax)
-                self.assertGreater(row[1], raMin)
-                self.assertLess(row[2], decMax)
-                self.assertGreater(row[2], decMin)
-
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
+            ct += len(chunk)
+            self.checkChunkInBox(chunk, raMin, raMax, decMin, decMax)
 
-                #keep a list of which points were returned by teh query
-                goodPoints.append(row[0])
-
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
+            #keep a list of which points were returned by teh query
+            goodPoints.extend(self.checkChunkAgainstBaseline(chunk))
 
         self.assertGreater(ct, 0)
 
-        ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            #make sure that the points not returned by the query are, in fact, outside of the
-            #box bound
-
-            switch = (entry[1] > raMax or entry[1] < raMin or entry[2] >decMax or entry[2] < decMin)
-            self.assertTrue(switch)
-            ct += 1
-        self.assertGreater(ct, 0)
+        #make sure that the points not returned by the query are, in fact, outside of the
+        #box bound
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        outside = self.outsideBox(raMin, raMax, decMin, decMax)
+        self.assertTrue(outside[notReturned].all())
 
 
     def testNonsenseArbitraryConstraints(self):
@@ -343,8 +634,6 @@ class CatalogDBObjectTestCase(unittest.TestCase):
         Test a query with a user-specified constraint on the magnitude column
         """
 
-        myNonsense = CatalogDBObject.from_objid('Nonsense')
-
         raMin = 50.0
         raMax = 150.0
         decMax = 30.0
@@ -357,7 +646,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
         boxObsMd = ObservationMetaData(boundType='box', pointingRA=raCenter, pointingDec=decCenter,
                     boundLength=numpy.array([0.5*(raMax-raMin), 0.5*(decMax-decMin)]), mjd=52000., bandpassName='r')
 
-        boxQuery = myNonsense.query_columns(colnames = mycolumns,
+        boxQuery = self.myNonsense.query_columns(colnames = mycolumns,
                       obs_metadata=boxObsMd, chunk_size=100, constraint = 'mag > 11.0')
 
         raMin = numpy.radians(raMin)
@@ -369,44 +658,30 @@ class CatalogDBObjectTestCase(unittest.TestCase):
 
         ct = 0
         for chunk in boxQuery:
-            for row in chunk:
-                ct += 1
-
-                self.assertLess(row[1], raMax)
-                self.assertGreater(row[1], raMin)
-                self.assertLess(row[2], decMax)
-                self.assertGreater(row[2], decMin)
-                self.assertGreater(row[3], 11.0)
-
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
-
-                #keep a list of the points returned by the query
-                goodPoints.append(row[0])
+            ct += len(chunk)
+            self.checkChunkInBox(chunk, raMin, raMax, decMin, decMax)
+            self.assertTrue((chunk['NonsenseMag'] > 11.0).all())
 
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
+            #keep a list of the points returned by the query
+            goodPoints.extend(self.checkChunkAgainstBaseline(chunk))
 
         self.assertGreater(ct, 0)
 
-        ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            #make sure that the points not returned by the query did, in fact, violate one of the
-            #constraints of the query (either the box bound or the magnitude cut off)
-            switch = (entry[1] > raMax or entry[1] < raMin or entry[2] >decMax or entry[2] < decMin or entry[3]<11.0)
-
-            self.assertTrue(switch)
-            ct += 1
-        self.assertGreater(ct, 0)
+        #make sure that the points not returned by the query did, in fact, violate one of the
+        #constraints of the query (either the box bound or the magnitude cut off)
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        outside = self.outsideBox(raMin, raMax, decMin, decMax)
+        outside |= (self.baselineMag <= 11.0)
+        self.assertTrue(outside[notReturned].all())
 
 
     def testArbitraryQuery(self):
         """
         Test method to directly execute an arbitrary SQL query (inherited from DBObject class)
         """
-        myNonsense = CatalogDBObject.from_objid('Nonsense')
         query = 'SELECT test.id, test.mag, test2.id, test2.mag FROM test, test2 WHERE test.id=test2.id'
-        results = myNonsense.execute_arbitrary(query)
+        results = self.myNonsense.execute_arbitrary(query)
         self.assertEqual(len(results), 1250)
         for row in results:
             self.assertEqual(row[0], row[2])
@@ -418,10 +693,9 @@ class CatalogDBObjectTestCase(unittest.TestCase):
         """
         Test method to create a ChunkIterator from an arbitrary SQL query (inherited from DBObject class)
         """
-        myNonsense = CatalogDBObject.from_objid('Nonsense')
         query = 'SELECT test.id, test.mag, test2.id, test2.mag FROM test, test2 WHERE test.id=test2.id'
         dtype = numpy.dtype([('id1', int), ('mag1', float), ('id2', int), ('mag2', float)])
-        results = myNonsense.get_chunk_iterator(query, chunk_size=100, dtype=dtype)
+        results = self.myNonsense.get_chunk_iterator(query, chunk_size=100, dtype=dtype)
         i = 0
         for chunk in results:
             for row in chunk:
@@ -435,59 +709,100 @@ class CatalogDBObjectTestCase(unittest.TestCase):
         Test that a query with a specified chunk_size does, in fact, return chunks of that size
         """
 
-        mystars = CatalogDBObject.from_objid('testCatalogDBObjectTeststars')
         mycolumns = ['id', 'raJ2000', 'decJ2000', 'umag', 'gmag']
-        myquery = mystars.query_columns(colnames = mycolumns, chunk_size = 1000)
+        myquery = self.myStars.query_columns(colnames = mycolumns, chunk_size = 1000)
 
         ct = 0
         for chunk in myquery:
             self.assertEqual(chunk.size, 1000)
-            for row in chunk:
-                ct += 1
-                self.assertEqual(len(row), 5)
+            #every row of a chunk shares the chunk's dtype
+            self.assertEqual(len(chunk.dtype.names), 5)
+            ct += len(chunk)
         self.assertGreater(ct, 0)
 
 
+    def testCountOnly(self):
+        """
+        Test that query_columns with count_only=True returns the number of rows
+        the equivalent query would have returned
+        """
+
+        boxObsMd = ObservationMetaData(boundType='box', pointingRA=50.0, pointingDec=0.0,
+                                       boundLength=numpy.array([20.0, 10.0]), mjd=52000., bandpassName='r')
+
+        kwargList = [dict(), dict(constraint='mag > 11.0'), dict(obs_metadata=boxObsMd),
+                     dict(obs_metadata=boxObsMd, constraint='mag > 11.0'), dict(limit=10)]
+
+        for kwargs in kwargList:
+            ct = 0
+            for chunk in self.myNonsense.query_columns(chunk_size=100, **kwargs):
+                ct += len(chunk)
+            self.assertGreater(ct, 0)
+            self.assertEqual(self.myNonsense.query_columns(count_only=True, **kwargs), ct)
+
+        self.assertEqual(self.myNonsense.query_columns(count_only=True), len(self.baselineIds))
+
+
+    def testDefaultChunkSize(self):
+        """
+        Test that query_columns falls back on defaultChunkSize when no chunk_size is given
+        """
+
+        class myNonsenseChunkedDB(myNonsenseDB):
+            objid = 'NonsenseChunked'
+            defaultChunkSize = 100
+
+        myNonsense = myNonsenseChunkedDB()
+
+        ct = 0
+        chunkCt = 0
+        for chunk in myNonsense.query_columns():
+            chunkCt += 1
+            self.assertLessEqual(len(chunk), 100)
+            ct += len(chunk)
+        self.assertEqual(ct, len(self.baselineIds))
+        self.assertEqual(chunkCt, int(numpy.ceil(len(self.baselineIds)/100.0)))
+
+        chunkList = list(myNonsense.query_columns(chunk_size=1000))
+        self.assertEqual(len(chunkList[0]), min(1000, len(self.baselineIds)))
+
+
     def testClassVariables(self):
         """
         Make sure that the daughter classes of CatalogDBObject properly overwrite the member
         variables of CatalogDBObject
         """
 
-        mystars = CatalogDBObject.from_objid('testCatalogDBObjectTeststars')
-        myNonsense = CatalogDBObject.from_objid('Nonsense')
-        mygalaxies = CatalogDBObject.from_objid('testCatalogDBObjectTestgals')
-
-        self.assertEqual(mystars.raColName, 'ra')
-        self.assertEqual(mystars.decColName, 'decl')
-        self.assertEqual(mystars.idColKey, 'id')
-        self.assertEqual(mystars.driver, 'sqlite')
-        self.assertEqual(mystars.database, 'testCatalogDBObjectDatabase.db')
-        self.assertEqual(mystars.appendint, 1023)
-        self.assertEqual(mystars.tableid, 'stars')
-        self.assertFalse(hasattr(mystars, 'spatialModel'))
-        self.assertEqual(mystars.objid, 'testCatalogDBObjectTeststars')
-
-        self.assertEqual(mygalaxies.raColName, 'ra')
-        self.assertEqual(mygalaxies.decColName, 'decl')
-        self.assertEqual(mygalaxies.idColKey, 'id')
-        self.assertEqual(mygalaxies.driver, 'sqlite')
-        self.assertEqual(mygalaxies.database, 'testCatalogDBObjectDatabase.db')
-        self.assertEqual(mygalaxies.appendint, 1022)
-        self.assertEqual(mygalaxies.tableid, 'galaxies')
-        self.assertTrue(hasattr(mygalaxies, 'spatialModel'))
-        self.assertEqual(mygalaxies.spatialModel, 'SERSIC2D')
-        self.assertEqual(mygalaxies.objid, 'testCatalogDBObjectTestgals')
-
-        self.assertEqual(myNonsense.raColName, 'ra')
-        self.assertEqual(myNonsense.decColName, 'dec')
-        self.assertEqual(myNonsense.idColKey, 'NonsenseId')
-        self.assertEqual(myNonsense.driver, 'sqlite')
-        self.assertEqual(myNonsense.database, 'testCatalogDBObjectNonsenseDB.db')
-        self.assertFalse(hasattr(myNonsense, 'appendint'))
-        self.assertEqual(myNonsense.tableid, 'test')
-        self.assertFalse(hasattr(myNonsense, 'spatialModel'))
-        self.assertEqual(myNonsense.objid, 'Nonsense')
+        self.assertEqual(self.myStars.raColName, 'ra')
+        self.assertEqual(self.myStars.decColName, 'decl')
+        self.assertEqual(self.myStars.idColKey, 'id')
+        self.assertEqual(self.myStars.driver, 'sqlite')
+        self.assertEqual(self.myStars.database, starGalDBName)
+        self.assertEqual(self.myStars.appendint, 1023)
+        self.assertEqual(self.myStars.tableid, 'stars')
+        self.assertFalse(hasattr(self.myStars, 'spatialModel'))
+        self.assertEqual(self.myStars.objid, 'testCatalogDBObjectTeststars')
+
+        self.assertEqual(self.myGals.raColName, 'ra')
+        self.assertEqual(self.myGals.decColName, 'decl')
+        self.assertEqual(self.myGals.idColKey, 'id')
+        self.assertEqual(self.myGals.driver, 'sqlite')
+        self.assertEqual(self.myGals.database, starGalDBName)
+        self.assertEqual(self.myGals.appendint, 1022)
+        self.assertEqual(self.myGals.tableid, 'galaxies')
+        self.assertTrue(hasattr(self.myGals, 'spatialModel'))
+        self.assertEqual(self.myGals.spatialModel, 'SERSIC2D')
+        self.assertEqual(self.myGals.objid, 'testCatalogDBObjectTestgals')
+
+        self.assertEqual(self.myNonsense.raColName, 'ra')
+        self.assertEqual(self.myNonsense.decColName, 'dec')
+        self.assertEqual(self.myNonsense.idColKey, 'NonsenseId')
+        self.assertEqual(self.myNonsense.driver, 'sqlite')
+        self.assertEqual(self.myNonsense.database, nonsenseDBName)
+        self.assertFalse(hasattr(self.myNonsense, 'appendint'))
+        self.assertEqual(self.myNonsense.tableid, 'test')
+        self.assertFalse(hasattr(self.myNonsense, 'spatialModel'))
+        self.assertEqual(self.myNonsense.objid, 'Nonsense')
 
         self.assertIn('teststars', CatalogDBObject.registry)
         self.assertIn('testgals', CatalogDBObject.registry)
@@ -504,7 +819,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
                         ('zmag', None), ('ymag', None),
                         ('magNorm', 'mag_norm', float)]
 
-        for (col, coltest) in zip(mystars.columns, colsShouldBe):
+        for (col, coltest) in zip(self.myStars.columns, colsShouldBe):
             self.assertEqual(col, coltest)
 
         colsShouldBe = [('NonsenseId', 'id', int),
@@ -512,7 +827,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
                ('NonsenseDecJ2000', 'dec*%f'%(numpy.pi/180.)),
                ('NonsenseMag', 'mag', float)]
 
-        for (col, coltest) in zip(myNonsense.columns, colsShouldBe):
+        for (col, coltest) in zip(self.myNonsense.columns, colsShouldBe):
             self.assertEqual(col, coltest)
 
         colsShouldBe = [('id', None, int),
@@ -533,7 +848,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
                ('a_bulge', None),
                ('b_bulge', None)]
 
-        for (col, coltest) in zip(mygalaxies.columns, colsShouldBe):
+        for (col, coltest) in zip(self.myGals.columns, colsShouldBe):
             self.assertEqual(col, coltest)
 
 
@@ -569,8 +884,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
         Pass connection directly in to the constructor.
         """
 
-        myNonsense_base = CatalogDBObject.from_objid('Nonsense')
-        myNonsense = myNonsenseDB_noConnection(connection=myNonsense_base.connection)
+        myNonsense = myNonsenseDB_noConnection(connection=self.myNonsense.connection)
 
         radius = 20.0
         raCenter = 210.0
@@ -591,30 +905,20 @@ class CatalogDBObjectTestCase(unittest.TestCase):
 
         ct = 0
         for chunk in circQuery:
-            for row in chunk:
-                ct += 1
-                distance = haversine(raCenter, decCenter, row[1], row[2])
-
-                self.assertLess(distance, radius)
-
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
-
-                #store a list of which objects fell within our circle bound
-                goodPoints.append(row[0])
+            ct += len(chunk)
+            distance = haversine(raCenter, decCenter, chunk['NonsenseRaJ2000'], chunk['NonsenseDecJ2000'])
+            self.assertTrue((distance < radius).all())
 
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
+            #store a list of which objects fell within our circle bound
+            goodPoints.extend(self.checkChunkAgainstBaseline(chunk))
         self.assertGreater(ct, 0)
 
-        ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            #make sure that all of the points not returned by the query were, in fact, outside of
-            #the circle bound
-            distance = haversine(raCenter, decCenter, numpy.radians(entry[1]), numpy.radians(entry[2]))
-            self.assertGreater(distance, radius)
-            ct += 1
-        self.assertGreater(ct, 0)
+        #make sure that all of the points not returned by the query were, in fact, outside of
+        #the circle bound
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        distance = haversine(raCenter, decCenter, self.raRad[notReturned], self.decRad[notReturned])
+        self.assertTrue((distance > radius).all())
 
 
     def testNonsenseSelectOnlySomeColumns_passConnection(self):
@@ -623,8 +927,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
 
         Pass connection directly in to the constructor.
         """
-        myNonsense_base = CatalogDBObject.from_objid('Nonsense')
-        myNonsense = myNonsenseDB_noConnection(connection=myNonsense_base.connection)
+        myNonsense = myNonsenseDB_noConnection(connection=self.myNonsense.connection)
 
         mycolumns = ['NonsenseId', 'NonsenseRaJ2000', 'NonsenseMag']
 
@@ -638,20 +941,18 @@ class CatalogDBObjectTestCase(unittest.TestCase):
                 ct += 1
                 self.assertLess(row[1], 45.0)
 
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
+                dex = self.idToIndex[row[0]]
 
                 goodPoints.append(row[0])
 
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[2], 3)
+                self.assertAlmostEqual(self.raRad[dex], row[1], 3)
+                self.assertAlmostEqual(self.baselineMag[dex], row[2], 3)
 
         self.assertGreater(ct, 0)
 
-        ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            self.assertGreater(entry[1], 45.0)
-            ct += 1
-        self.assertGreater(ct, 0)
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        self.assertTrue((self.baselineRa[notReturned] > 45.0).all())
 
 
     def testNonsenseBoxConstraints_passConnection(self):
@@ -662,8 +963,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
         Pass connection directly in to the constructor.
         """
 
-        myNonsense_base = CatalogDBObject.from_objid('Nonsense')
-        myNonsense = myNonsenseDB_noConnection(connection=myNonsense_base.connection)
+        myNonsense = myNonsenseDB_noConnection(connection=self.myNonsense.connection)
 
         raMin = 50.0
         raMax = 150.0
@@ -689,32 +989,19 @@ class CatalogDBObjectTestCase(unittest.TestCase):
 
         ct = 0
         for chunk in boxQuery:
-            for row in chunk:
-                ct += 1
-                self.assertLess(row[1], raMax)
-                self.assertGreater(row[1], raMin)
-                self.assertLess(row[2], decMax)
-                self.assertGreater(row[2], decMin)
+            ct += len(chunk)
+            self.checkChunkInBox(chunk, raMin, raMax, decMin, decMax)
 
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
-
-                #keep a list of which points were returned by teh query
-                goodPoints.append(row[0])
-
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
+            #keep a list of which points were returned by teh query
+            goodPoints.extend(self.checkChunkAgainstBaseline(chunk))
         self.assertGreater(ct, 0)
 
-        ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            #make sure that the points not returned by the query are, in fact, outside of the
-            #box bound
-
-            switch = (entry[1] > raMax or entry[1] < raMin or entry[2] >decMax or entry[2] < decMin)
-            self.assertTrue(switch)
-            ct += 1
-        self.assertGreater(ct, 0)
+        #make sure that the points not returned by the query are, in fact, outside of the
+        #box bound
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        outside = self.outsideBox(raMin, raMax, decMin, decMax)
+        self.assertTrue(outside[notReturned].all())
 
 
     def testNonsenseArbitraryConstraints_passConnection(self):
@@ -724,8 +1011,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
         Pass connection directly in to the constructor.
         """
 
-        myNonsense_base = CatalogDBObject.from_objid('Nonsense')
-        myNonsense = myNonsenseDB_noConnection(connection=myNonsense_base.connection)
+        myNonsense = myNonsenseDB_noConnection(connection=self.myNonsense.connection)
 
         raMin = 50.0
         raMax = 150.0
@@ -751,34 +1037,21 @@ class CatalogDBObjectTestCase(unittest.TestCase):
 
         ct = 0
         for chunk in boxQuery:
-            for row in chunk:
-                ct += 1
-
-                self.assertLess(row[1], raMax)
-                self.assertGreater(row[1], raMin)
-                self.assertLess(row[2], decMax)
-                self.assertGreater(row[2], decMin)
-                self.assertGreater(row[3], 11.0)
-
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
-
-                #keep a list of the points returned by the query
-                goodPoints.append(row[0])
+            ct += len(chunk)
+            self.checkChunkInBox(chunk, raMin, raMax, decMin, decMax)
+            self.assertTrue((chunk['NonsenseMag'] > 11.0).all())
 
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
+            #keep a list of the points returned by the query
+            goodPoints.extend(self.checkChunkAgainstBaseline(chunk))
         self.assertGreater(ct, 0)
 
-        ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            #make sure that the points not returned by the query did, in fact, violate one of the
-            #constraints of the query (either the box bound or the magnitude cut off)
-            switch = (entry[1] > raMax or entry[1] < raMin or entry[2] >decMax or entry[2] < decMin or entry[3]<11.0)
-
-            self.assertTrue(switch)
-            ct += 1
-        self.assertGreater(ct, 0)
+        #make sure that the points not returned by the query did, in fact, violate one of the
+        #constraints of the query (either the box bound or the magnitude cut off)
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        outside = self.outsideBox(raMin, raMax, decMin, decMax)
+        outside |= (self.baselineMag <= 11.0)
+        self.assertTrue(outside[notReturned].all())
 
 
     def testArbitraryQuery_passConnection(self):
@@ -787,8 +1060,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
 
         Pass connection directly in to the constructor.
         """
-        myNonsense_base = CatalogDBObject.from_objid('Nonsense')
-        myNonsense = myNonsenseDB_noConnection(connection=myNonsense_base.connection)
+        myNonsense = myNonsenseDB_noConnection(connection=self.myNonsense.connection)
         query = 'SELECT test.id, test.mag, test2.id, test2.mag FROM test, test2 WHERE test.id=test2.id'
         results = myNonsense.execute_arbitrary(query)
         self.assertEqual(len(results), 1250)
@@ -806,8 +1078,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
 
         Pass connection directly in to the constructor.
         """
-        myNonsense_base = CatalogDBObject.from_objid('Nonsense')
-        myNonsense = myNonsenseDB_noConnection(connection=myNonsense_base.connection)
+        myNonsense = myNonsenseDB_noConnection(connection=self.myNonsense.connection)
         query = 'SELECT test.id, test.mag, test2.id, test2.mag FROM test, test2 WHERE test.id=test2.id'
         dtype = numpy.dtype([('id1', int), ('mag1', float), ('id2', int), ('mag2', float)])
         results = myNonsense.get_chunk_iterator(query, chunk_size=100, dtype=dtype)
@@ -844,7 +1115,7 @@ class CatalogDBObjectTestCase(unittest.TestCase):
         self.assertEqual(ct, 0)
 
 
-class fileDBObjectTestCase(unittest.TestCase):
+class fileDBObjectTestCase(NonsenseBaselineMixin, unittest.TestCase):
     """
     This class will re-implement the tests from CatalogDBObjectTestCase,
     except that it will use a Nonsense CatalogDBObject loaded with fileDBObject
@@ -852,13 +1123,16 @@ class fileDBObjectTestCase(unittest.TestCase):
     database.
     """
 
-    def setUp(self):
-        self.testDataFile = os.path.join(
+    @classmethod
+    def setUpClass(cls):
+        cls.testDataFile = os.path.join(
             getPackageDir('sims_catalogs_generation'), 'tests', 'testData', 'CatalogsGenerationTestData.txt')
-        self.testHeaderFile = os.path.join(
+        cls.testHeaderFile = os.path.join(
             getPackageDir('sims_catalogs_generation'), 'tests', 'testData', 'CatalogsGenerationTestDataHeader.txt')
 
-        self.myNonsense = fileDBObject.from_objid('fileNonsense', self.testDataFile,
+        #loading the files into the (in-memory) databases only needs to happen once;
+        #none of the tests change them
+        cls.myNonsense = fileDBObject.from_objid('fileNonsense', cls.testDataFile,
                        dtype = numpy.dtype([('id', int), ('ra', float), ('dec', float), ('mag', float)]),
                        skipLines = 0)
                        #
@@ -866,24 +1140,18 @@ class fileDBObjectTestCase(unittest.TestCase):
                        #lose the first line of your input file (which maybe you want to do if that
                        #is a header)
 
-        self.myNonsenseHeader = fileDBObject.from_objid('fileNonsense', self.testHeaderFile)
+        cls.myNonsenseHeader = fileDBObject.from_objid('fileNonsense', cls.testHeaderFile)
         #this time, make fileDBObject learn the dtype from a header
 
-        """
-        baselineData will store another copy of the data that should be stored in
-        testCatalogDBObjectNonsenseDB.db.  This will give us something to test database queries
-        against when we ask for all of the objects within a certain box or circle bound
-        """
-        self.dtype=[('id', int), ('ra', float), ('dec', float), ('mag', float)]
-        self.baselineData=numpy.loadtxt(self.testDataFile, dtype=self.dtype)
+        cls.loadBaseline(cls.testDataFile)
 
-    def tearDown(self):
-        del self.testDataFile
-        del self.testHeaderFile
-        del self.myNonsense
-        del self.myNonsenseHeader
-        del self.dtype
-        del self.baselineData
+    @classmethod
+    def tearDownClass(cls):
+        del cls.testDataFile
+        del cls.testHeaderFile
+        del cls.myNonsense
+        del cls.myNonsenseHeader
+        cls.deleteBaseline()
 
     def testDatabaseName(self):
         self.assertEqual(self.myNonsense.database, ':memory:')
@@ -913,46 +1181,30 @@ class fileDBObjectTestCase(unittest.TestCase):
 
         ct = 0
         for chunk in circQuery:
-            for row in chunk:
-                ct += 1
-                distance = haversine(raCenter, decCenter, row[1], row[2])
-
-                self.assertLess(distance, radius)
-
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
+            ct += len(chunk)
+            distance = haversine(raCenter, decCenter, chunk['NonsenseRaJ2000'], chunk['NonsenseDecJ2000'])
+            self.assertTrue((distance < radius).all())
 
-                #store a list of which objects fell within our circle bound
-                goodPoints.append(row[0])
-
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
+            #store a list of which objects fell within our circle bound
+            goodPoints.extend(self.checkChunkAgainstBaseline(chunk))
         self.assertGreater(ct, 0)
 
-        ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            #make sure that all of the points not returned by the query were, in fact, outside of
-            #the circle bound
-            distance = haversine(raCenter, decCenter, numpy.radians(entry[1]), numpy.radians(entry[2]))
-            self.assertGreater(distance, radius)
-            ct += 1
-        self.assertGreater(ct, 0)
+        #make sure that all of the points not returned by the query were, in fact, outside of
+        #the circle bound
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        distance = haversine(raCenter, decCenter, self.raRad[notReturned], self.decRad[notReturned])
+        self.assertTrue((distance > radius).all())
 
         #make sure that the CatalogDBObject which used a header gets the same result
         headerQuery = self.myNonsenseHeader.query_columns(colnames = mycolumns, obs_metadata=circObsMd, chunk_size=100)
         goodPointsHeader = []
         for chunk in headerQuery:
-            for row in chunk:
-                distance = haversine(raCenter, decCenter, row[1], row[2])
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
-                goodPointsHeader.append(row[0])
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
+            distance = haversine(raCenter, decCenter, chunk['NonsenseRaJ2000'], chunk['NonsenseDecJ2000'])
+            self.assertTrue((distance < radius).all())
+            goodPointsHeader.extend(self.checkChunkAgainstBaseline(chunk))
 
-        self.assertEqual(len(goodPoints), len(goodPointsHeader))
-        for xx in goodPoints:
-            self.assertIn(xx, goodPointsHeader)
+        self.assertEqual(sorted(goodPoints), sorted(goodPointsHeader))
 
     def testNonsenseSelectOnlySomeColumns(self):
         """
@@ -971,33 +1223,29 @@ class fileDBObjectTestCase(unittest.TestCase):
                 ct += 1
                 self.assertLess(row[1], 45.0)
 
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
+                dex = self.idToIndex[row[0]]
 
                 goodPoints.append(row[0])
 
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[2], 3)
+                self.assertAlmostEqual(self.raRad[dex], row[1], 3)
+                self.assertAlmostEqual(self.baselineMag[dex], row[2], 3)
 
         self.assertGreater(ct, 0)
 
-        ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            self.assertGreater(entry[1], 45.0)
-            ct += 1
-        self.assertGreater(ct, 0)
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        self.assertTrue((self.baselineRa[notReturned] > 45.0).all())
 
         headerQuery = self.myNonsenseHeader.query_columns(colnames=mycolumns, constraint = 'ra < 45.', chunk_size=100)
         goodPointsHeader = []
         for chunk in headerQuery:
             for row in chunk:
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
+                dex = self.idToIndex[row[0]]
                 goodPointsHeader.append(row[0])
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[2], 3)
+                self.assertAlmostEqual(self.raRad[dex], row[1], 3)
+                self.assertAlmostEqual(self.baselineMag[dex], row[2], 3)
 
-        self.assertEqual(len(goodPoints), len(goodPointsHeader))
-        for xx in goodPoints:
-            self.assertIn(xx, goodPointsHeader)
+        self.assertEqual(sorted(goodPoints), sorted(goodPointsHeader))
 
     def testNonsenseBoxConstraints(self):
         """
@@ -1028,46 +1276,26 @@ class fileDBObjectTestCase(unittest.TestCase):
 
         ct = 0
         for chunk in boxQuery:
-            for row in chunk:
-                ct += 1
-                self.assertLess(row[1], raMax)
-                self.assertGreater(row[1], raMin)
-                self.assertLess(row[2], decMax)
-                self.assertGreater(row[2], decMin)
-
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
+            ct += len(chunk)
+            self.checkChunkInBox(chunk, raMin, raMax, decMin, decMax)
 
-                #keep a list of which points were returned by teh query
-                goodPoints.append(row[0])
-
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
+            #keep a list of which points were returned by teh query
+            goodPoints.extend(self.checkChunkAgainstBaseline(chunk))
         self.assertGreater(ct, 0)
 
-        ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            #make sure that the points not returned by the query are, in fact, outside of the
-            #box bound
-
-            switch = (entry[1] > raMax or entry[1] < raMin or entry[2] >decMax or entry[2] < decMin)
-            self.assertTrue(switch)
-            ct += 1
-        self.assertGreater(ct, 0)
+        #make sure that the points not returned by the query are, in fact, outside of the
+        #box bound
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        outside = self.outsideBox(raMin, raMax, decMin, decMax)
+        self.assertTrue(outside[notReturned].all())
 
         headerQuery = self.myNonsenseHeader.query_columns(obs_metadata=boxObsMd, chunk_size=100, colnames=mycolumns)
         goodPointsHeader = []
         for chunk in headerQuery:
-            for row in chunk:
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
-                goodPointsHeader.append(row[0])
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
+            goodPointsHeader.extend(self.checkChunkAgainstBaseline(chunk))
 
-        self.assertEqual(len(goodPoints), len(goodPointsHeader))
-        for xx in goodPoints:
-            self.assertIn(xx, goodPointsHeader)
+        self.assertEqual(sorted(goodPoints), sorted(goodPointsHeader))
 
     def testNonsenseArbitraryConstraints(self):
         """
@@ -1098,49 +1326,29 @@ class fileDBObjectTestCase(unittest.TestCase):
 
         ct = 0
         for chunk in boxQuery:
-            for row in chunk:
-                ct += 1
-
-                self.assertLess(row[1], raMax)
-                self.assertGreater(row[1], raMin)
-                self.assertLess(row[2], decMax)
-                self.assertGreater(row[2], decMin)
-                self.assertGreater(row[3], 11.0)
-
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
+            ct += len(chunk)
+            self.checkChunkInBox(chunk, raMin, raMax, decMin, decMax)
+            self.assertTrue((chunk['NonsenseMag'] > 11.0).all())
 
-                #keep a list of the points returned by the query
-                goodPoints.append(row[0])
-
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
+            #keep a list of the points returned by the query
+            goodPoints.extend(self.checkChunkAgainstBaseline(chunk))
         self.assertGreater(ct, 0)
 
-        ct = 0
-        for entry in [xx for xx in self.baselineData if xx[0] not in goodPoints]:
-            #make sure that the points not returned by the query did, in fact, violate one of the
-            #constraints of the query (either the box bound or the magnitude cut off)
-            switch = (entry[1] > raMax or entry[1] < raMin or entry[2] >decMax or entry[2] < decMin or entry[3]<11.0)
-
-            self.assertTrue(switch)
-            ct += 1
-        self.assertGreater(ct, 0)
+        #make sure that the points not returned by the query did, in fact, violate one of the
+        #constraints of the query (either the box bound or the magnitude cut off)
+        notReturned = numpy.logical_not(numpy.in1d(self.baselineIds, goodPoints))
+        self.assertGreater(notReturned.sum(), 0)
+        outside = self.outsideBox(raMin, raMax, decMin, decMax)
+        outside |= (self.baselineMag <= 11.0)
+        self.assertTrue(outside[notReturned].all())
 
         headerQuery = self.myNonsenseHeader.query_columns(colnames = mycolumns,
                  obs_metadata=boxObsMd, chunk_size=100, constraint='mag > 11.0')
         goodPointsHeader = []
         for chunk in headerQuery:
-            for row in chunk:
-                dex = numpy.where(self.baselineData['id'] == row[0])[0][0]
-                goodPointsHeader.append(row[0])
-                self.assertAlmostEqual(numpy.radians(self.baselineData['ra'][dex]), row[1], 3)
-                self.assertAlmostEqual(numpy.radians(self.baselineData['dec'][dex]), row[2], 3)
-                self.assertAlmostEqual(self.baselineData['mag'][dex], row[3], 3)
+            goodPointsHeader.extend(self.checkChunkAgainstBaseline(chunk))
 
-        self.assertEqual(len(goodPoints), len(goodPointsHeader))
-        for xx in goodPoints:
-            self.assertIn(xx, goodPointsHeader)
+        self.assertEqual(sorted(goodPoints), sorted(goodPointsHeader))
 
     def testChunking(self):
         """
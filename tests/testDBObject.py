@@ -214,6 +214,22 @@ class DBObjectTestCase(unittest.TestCase):
         for chunk in results:
             self.assertEqual(chunk.dtype, dtype)
 
+    def testEmptyArbitraryQuery(self):
+        """
+        Test that execute_arbitrary returns an empty recarray (rather than failing
+        while guessing the dtype) when the query matches no rows
+        """
+        dbobj = DBObject(driver=self.driver, database=self.database)
+        query = 'SELECT id, log FROM doubleTable WHERE id < 0'
+        results = dbobj.execute_arbitrary(query)
+        self.assertEqual(len(results), 0)
+        self.assertEqual(results.dtype.names, ('id', 'log'))
+
+        dtype = [('id', int), ('log', float)]
+        results = dbobj.execute_arbitrary(query, dtype = dtype)
+        self.assertEqual(len(results), 0)
+        self.assertEqual(results.dtype, dtype)
+
     def testJoin(self):
         """
         Test a join
@@ -313,6 +329,42 @@ class DBObjectTestCase(unittest.TestCase):
         #make sure we found all the matches we should have
 
 
+    def testSeparateConnections(self):
+        """
+        Test that DBObjects only share a DBConnection when it is passed in
+        explicitly, so that a DBObject opened after its database file has been
+        rebuilt sees the new contents
+        """
+        dbName = 'testDBObjectRebuiltDB.db'
+
+        def makeDB(nRows):
+            if os.path.exists(dbName):
+                os.unlink(dbName)
+            conn = sqlite3.connect(dbName)
+            conn.execute('''CREATE TABLE rebuiltTable (id int)''')
+            conn.executemany('''INSERT INTO rebuiltTable VALUES (?)''', [(ii,) for ii in range(nRows)])
+            conn.commit()
+            conn.close()
+
+        try:
+            makeDB(5)
+            dbobj1 = DBObject(driver=self.driver, database=dbName)
+            results = dbobj1.execute_arbitrary('SELECT COUNT(*) FROM rebuiltTable')
+            self.assertEqual(results[0][0], 5)
+
+            makeDB(7)
+            dbobj2 = DBObject(driver=self.driver, database=dbName)
+            self.assertIsNot(dbobj1.connection, dbobj2.connection)
+            results = dbobj2.execute_arbitrary('SELECT COUNT(*) FROM rebuiltTable')
+            self.assertEqual(results[0][0], 7)
+
+            dbobj3 = DBObject(connection=dbobj2.connection)
+            self.assertIs(dbobj3.connection, dbobj2.connection)
+        finally:
+            if os.path.exists(dbName):
+                os.unlink(dbName)
+
+
     def testValidationErrors(self):
         """ Test that appropriate errors and warnings are thrown when connecting
         """